@@ -0,0 +1,87 @@
+"""
+Benchmark the vectorised build_address against the old row-wise
+DataFrame.apply version on synthetic saon/paon/street columns.
+
+    python benchmarks/bench_build_address.py --rows 1000000
+"""
+import os
+import sys
+import argparse
+import timeit
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from etl.transform.clean_house_prices import build_address
+
+
+def build_address_rowwise(df: pd.DataFrame) -> pd.DataFrame:
+    """The original implementation, kept here as the baseline."""
+    def make(row):
+        raw_parts = [row.get("saon"), row.get("paon"), row.get("street")]
+        parts = [
+            str(p).strip() for p in raw_parts
+            if pd.notna(p) and str(p).strip()
+        ]
+        if not parts:
+            return None
+        return (
+            ", ".join(parts[:-1]) + (" " if len(parts) > 1 else "") + parts[-1]
+        )
+
+    df["address"] = df.apply(make, axis=1)
+    return df.drop(columns=["saon", "paon", "street"], errors="ignore")
+
+
+def synthetic_address_parts(rows: int, seed: int = 42) -> pd.DataFrame:
+    """saon/paon/street columns with the blanks and padding seen in PPD."""
+    rng = np.random.default_rng(seed)
+    saon = np.array(
+        ["Flat 1", "Flat 22", " Flat 3 ", "Basement", "", "  ", None],
+        dtype=object,
+    )
+    paon = np.array(
+        ["1", "12A", "1-3", "Rose Court", " 7 ", "", None], dtype=object
+    )
+    street = np.array(
+        ["Seward Street", "High Road", " Main St", "", None], dtype=object
+    )
+    return pd.DataFrame({
+        "saon":   rng.choice(saon, rows, p=[.1, .1, .05, .05, .1, .05, .55]),
+        "paon":   rng.choice(paon, rows, p=[.3, .2, .1, .2, .1, .05, .05]),
+        "street": rng.choice(street, rows, p=[.4, .3, .2, .05, .05]),
+        "price":  rng.integers(100_000, 2_000_000, rows),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    df = synthetic_address_parts(args.rows)
+
+    rowwise = min(timeit.repeat(
+        lambda: build_address_rowwise(df.copy()), number=1, repeat=args.repeat
+    ))
+    vectorised = min(timeit.repeat(
+        lambda: build_address(df.copy()), number=1, repeat=args.repeat
+    ))
+
+    expected = build_address_rowwise(df.copy())["address"]
+    actual = build_address(df.copy())["address"]
+    identical = expected.isna().equals(actual.isna()) and (
+        expected.dropna() == actual.dropna()
+    ).all()
+
+    print(f"rows:        {args.rows:,}")
+    print(f"row-wise:    {rowwise:.2f} s")
+    print(f"vectorised:  {vectorised:.2f} s")
+    print(f"speedup:     {rowwise / vectorised:.1f}x")
+    print(f"identical:   {identical}")
+    if not identical:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+End-to-end ETL benchmark: generate synthetic PPD files, then time the
+extract, every clean_house_prices stage and the load into Postgres, and
+append the result (tagged with the git commit) to a JSON-lines history so
+a regression shows up against the previous run of the same size.
+
+By default the load goes to a throwaway server started with
+pytest-postgresql's executor (needs pg_ctl on PATH or --pg-ctl);
+--env dev|test|prod loads into that environment's target database instead.
+
+    python benchmarks/bench_etl.py --rows 1000000
+    python benchmarks/bench_etl.py --rows 100000 --env test --repeat 3
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import platform
+import subprocess
+import tempfile
+import timeit
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+import pandas as pd
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.synthetic_ppd import write_raw_files
+from etl.config.env_config import setup_env, ENVS
+from etl.extract import extract_house_prices
+from etl.transform.clean_house_prices import clean_house_prices
+from etl.load.load import load_data
+from utils.db_utils import dispose_db_engines
+from utils.metrics_utils import summarise_stages
+
+REPO = Path(__file__).resolve().parent.parent
+
+RESULTS = REPO / ".cache" / "bench" / "results.jsonl"
+DATA_DIR = REPO / ".cache" / "bench" / "data"
+
+# a step this much slower than the previous run of the same size is flagged
+REGRESSION_THRESHOLD = 0.10
+
+DB_ENV = ("NAME", "USER", "PASSWORD", "HOST", "PORT")
+
+
+@contextmanager
+def throwaway_postgres(pg_ctl: str):
+    """Start a temporary Postgres and point SOURCE_/TARGET_DB_* at it."""
+    from port_for import get_port
+    from pytest_postgresql.executor import PostgreSQLExecutor
+    from pytest_postgresql.janitor import DatabaseJanitor
+
+    tmp = Path(tempfile.mkdtemp(prefix="bench_pg_"))
+    port = get_port(None)
+    executor = PostgreSQLExecutor(
+        executable=pg_ctl, host="127.0.0.1", port=port,
+        datadir=str(tmp / "data"), unixsocketdir=str(tmp),
+        logfile=str(tmp / "postgresql.log"), startparams="-w",
+        dbname="bench", user="postgres", password="",
+    )
+    try:
+        with executor:
+            executor.wait_for_postgres()
+            with DatabaseJanitor(user="postgres", host="127.0.0.1",
+                                 port=port, version=executor.version,
+                                 dbname="bench", password=""):
+                values = dict(zip(
+                    DB_ENV, ("bench", "postgres", "", "127.0.0.1", str(port))
+                ))
+                for prefix in ("SOURCE", "TARGET"):
+                    os.environ.update({
+                        f"{prefix}_DB_{k}": v for k, v in values.items()
+                    })
+                yield
+                dispose_db_engines()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+@contextmanager
+def configured_database(env: str):
+    """Use the target database of a .env file."""
+    setup_env([sys.argv[0], env])
+    yield
+    dispose_db_engines()
+
+
+def prepare_data(rows: int, seed: int, directory: Path) -> int:
+    """Generate the raw files once per (rows, seed) and reuse them after."""
+    meta = directory / "_bench.json"
+    if meta.exists() and json.loads(meta.read_text())[:2] == [rows, seed]:
+        return json.loads(meta.read_text())[2]
+    shutil.rmtree(directory, ignore_errors=True)
+    start_time = timeit.default_timer()
+    written = write_raw_files(str(directory), rows, seed)
+    meta.write_text(json.dumps([rows, seed, written]))
+    elapsed = timeit.default_timer() - start_time
+    print(f"Generated {written} raw rows in {elapsed:.1f}s")
+    return written
+
+
+def run_once(directory: Path) -> dict:
+    """Time extract → clean stages → load once; seconds per step."""
+    extract_house_prices.RAW_DIR = str(directory)
+    timings = {}
+
+    start_time = timeit.default_timer()
+    raw = extract_house_prices.extract_house_prices()
+    timings["extract"] = timeit.default_timer() - start_time
+
+    metrics = []
+    clean = clean_house_prices(raw, metrics)
+    del raw
+    for stage in summarise_stages(metrics):
+        timings[f"transform.{stage['stage']}"] = stage["seconds"]
+
+    start_time = timeit.default_timer()
+    load_data(clean)
+    timings["load"] = timeit.default_timer() - start_time
+    return {"rows_clean": len(clean), "seconds": timings}
+
+
+def git_commit() -> str:
+    try:
+        sha = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=REPO, capture_output=True, text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{sha}-dirty" if dirty else sha
+
+
+def previous_result(path: Path, rows: int) -> dict:
+    """Last recorded run with the same number of rows, or None."""
+    if not path.exists():
+        return None
+    lines = path.read_text().splitlines()
+    runs = [json.loads(line) for line in lines if line.strip()]
+    same = [run for run in runs if run["rows"] == rows]
+    return same[-1] if same else None
+
+
+def report(result: dict, previous: dict,
+           threshold: float = REGRESSION_THRESHOLD) -> list:
+    """Print the timings beside the previous run; return regressed steps."""
+    before = previous["seconds"] if previous else {}
+    regressed = []
+    against = f"vs {previous['commit']}" if previous else "no previous run"
+    print(f"\n{'step':<48}{'seconds':>10}{against:>22}")
+    for step, seconds in result["seconds"].items():
+        change = ""
+        if before.get(step):
+            ratio = seconds / before[step] - 1
+            change = f"{ratio:+.0%}"
+            # sub-10ms steps are mostly noise
+            if ratio > threshold and seconds - before[step] > .01:
+                regressed.append(step)
+                change += "  ← slower"
+        print(f"{step:<48}{seconds:>10.3f}{change:>22}")
+    total = sum(result["seconds"].values())
+    rate = result["rows_raw"] / total
+    print(f"{'total':<48}{total:>10.3f}   ({rate:,.0f} raw rows/s)")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--rows", type=int, default=100_000,
+        help="synthetic rows to generate (before duplicates)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--repeat", type=int, default=1,
+        help="runs to take the fastest of, per step",
+    )
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    parser.add_argument("--results", type=Path, default=RESULTS)
+    parser.add_argument(
+        "--env", choices=ENVS, default=None,
+        help="load into this environment's target database instead of a "
+             "throwaway server",
+    )
+    parser.add_argument(
+        "--pg-ctl", default=os.getenv("PG_CTL") or shutil.which("pg_ctl"),
+        help="pg_ctl used to start the throwaway server",
+    )
+    args = parser.parse_args()
+
+    written = prepare_data(args.rows, args.seed, args.data_dir)
+    if args.env:
+        database = configured_database(args.env)
+    elif not args.pg_ctl:
+        sys.exit("pg_ctl not found: pass --pg-ctl, set PG_CTL, or use --env")
+    else:
+        database = throwaway_postgres(args.pg_ctl)
+
+    with database:
+        runs = [run_once(args.data_dir) for _ in range(args.repeat)]
+
+    result = {
+        "commit": git_commit(),
+        "recorded_at": (
+            datetime.now(timezone.utc).isoformat(timespec="seconds")
+        ),
+        "rows": args.rows,
+        "seed": args.seed,
+        "rows_raw": written,
+        "rows_clean": runs[0]["rows_clean"],
+        "repeat": args.repeat,
+        "machine": (
+            f"{platform.node()} {platform.machine()} {os.cpu_count()} cpu"
+        ),
+        "versions": {
+            "python": platform.python_version(), "pandas": pd.__version__,
+        },
+        "seconds": {
+            step: round(min(run["seconds"][step] for run in runs), 6)
+            for step in runs[0]["seconds"]
+        },
+    }
+    previous = previous_result(args.results, args.rows)
+    regressed = report(result, previous)
+
+    args.results.parent.mkdir(parents=True, exist_ok=True)
+    with args.results.open("a") as f:
+        f.write(json.dumps(result) + "\n")
+    print(f"\nRecorded in {args.results}")
+    if regressed:
+        print(
+            f"Slower than {previous['commit']} by more than "
+            f"{REGRESSION_THRESHOLD:.0%}: {', '.join(regressed)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
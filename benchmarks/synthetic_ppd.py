@@ -0,0 +1,228 @@
+"""
+Synthetic Land Registry Price Paid Data in the layout of the raw borough
+files (data/raw/unclean_<borough>.csv), for benchmarking the ETL at
+sizes the real extract never reaches.
+
+The rows look like PPD: postcodes are skewed towards a few busy outcodes,
+properties are resold (a Zipf-distributed pool, so some addresses sell many
+times), prices follow an outcode level, the property type and a yearly trend,
+and a small share of values is dirty the way the real files are (missing
+or non-numeric prices, missing postcodes, unparseable dates, padded or blank
+address parts, "Other" property types, category B sales and duplicate sales).
+
+    python benchmarks/synthetic_ppd.py --rows 1000000 --out data/bench
+"""
+import os
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+from typing import Iterator
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from etl.extract.extract_house_prices import RAW_FILES
+
+# outcodes per borough, busiest first; sales are Zipf-weighted over the list
+BOROUGH_OUTCODES = {
+    "Brent":       ["NW10", "HA9", "NW2", "HA0", "NW6", "NW9", "HA3"],
+    "Greenwich":   ["SE18", "SE10", "SE9", "SE3", "SE7", "SE2", "SE28"],
+    "Hackney":     ["E8", "E5", "N16", "E9", "N1", "E2", "N4"],
+    "Wandsworth":  ["SW18", "SW11", "SW17", "SW15", "SW12", "SW19", "SW8"],
+    "Westminster": ["W2", "W1", "SW1", "NW8", "W9", "WC2", "NW1"],
+}
+
+# typical price in each borough's busiest outcode
+BOROUGH_LEVEL = {
+    "Brent": 520_000, "Greenwich": 430_000, "Hackney": 620_000,
+    "Wandsworth": 720_000, "Westminster": 1_150_000,
+}
+
+# share of the rows that goes to each borough file
+BOROUGH_SHARE = {
+    "Brent": .2, "Greenwich": .2, "Hackney": .2,
+    "Wandsworth": .25, "Westminster": .15,
+}
+
+STREETS = np.array([
+    "High Street", "Church Road", "Station Road", "Park Avenue",
+    "Victoria Road", "Green Lane", "Manor Road", "Kings Road", "Queens Road",
+    "Mill Lane", "The Avenue", "London Road", "Grove Road", "Albert Road",
+    "York Road",
+], dtype=object)
+
+PROPERTY_TYPES = np.array(["F", "T", "S", "D", "O"], dtype=object)
+PROPERTY_TYPE_P = [.55, .25, .12, .06, .02]
+PRICE_FACTOR = {"F": .8, "T": 1.1, "S": 1.4, "D": 2.2, "O": 1.0}
+
+# probability of each kind of dirty value, per row
+DIRTY = {
+    "missing_price":    .002,
+    "bad_price":        .001,
+    "missing_postcode": .003,
+    "bad_date":         .002,
+    "padded_address":   .01,
+    "category_b":       .1,
+    "duplicate_sale":   .005,
+}
+
+# average number of sales per property in the pool
+SALES_PER_PROPERTY = 1.6
+ZIPF_A = 1.2
+
+
+def _borough_index(borough: str) -> int:
+    return list(RAW_FILES).index(borough)
+
+
+def _zipf_choice(rng, n: int, size: int, a: float = ZIPF_A) -> np.ndarray:
+    """Indexes in [0, n) with P(k) ∝ 1/(k+1)^a, the busiest first."""
+    weights = 1.0 / np.arange(1, n + 1) ** a
+    return rng.choice(n, size=size, p=weights / weights.sum())
+
+
+def _properties(borough: str, n: int, seed: int) -> pd.DataFrame:
+    """The fixed attributes of n properties in one borough."""
+    rng = np.random.default_rng([seed, n, _borough_index(borough)])
+    outcodes = np.array(BOROUGH_OUTCODES[borough], dtype=object)
+    outcode = _zipf_choice(rng, len(outcodes), n)
+    letters = np.array(list("ABDEFGHJLNPQRSTUWXYZ"), dtype=object)
+    postcode = (
+        outcodes[outcode] + " "
+        + rng.integers(1, 10, n).astype(str).astype(object)
+        + letters[rng.integers(0, 20, n)] + letters[rng.integers(0, 20, n)]
+    )
+    property_type = rng.choice(PROPERTY_TYPES, n, p=PROPERTY_TYPE_P)
+    is_flat = property_type == "F"
+    flat = rng.integers(1, 40, n).astype(str).astype(object)
+    saon = np.where(is_flat, "Flat " + flat, None)
+    return pd.DataFrame({
+        "postcode": postcode,
+        "property_type": property_type,
+        "estate_type": np.where(is_flat | (rng.random(n) < .05), "L", "F"),
+        "saon": saon,
+        "paon": rng.integers(1, 250, n).astype(str),
+        "street": STREETS[rng.integers(0, len(STREETS), n)],
+        # busier outcodes are the pricier ones
+        "level": (
+            BOROUGH_LEVEL[borough] * (1 - .5 * outcode / len(outcodes))
+            * rng.lognormal(0, .25, n)
+        ),
+    })
+
+
+def generate_ppd(rows: int, borough: str, seed: int = 0,
+                 start: str = "2015-01-01", end: str = "2024-12-31",
+                 chunksize: int = 1_000_000) -> Iterator[pd.DataFrame]:
+    """
+    Yield `rows` synthetic raw PPD rows for one borough, chunksize at a time,
+    so 50M rows never have to be in memory together.
+    """
+    pool = _properties(borough, max(int(rows / SALES_PER_PROPERTY), 1), seed)
+    first = pd.Timestamp(start).value // 86_400 // 10**9
+    last = pd.Timestamp(end).value // 86_400 // 10**9
+    district = (
+        "CITY OF WESTMINSTER" if borough == "Westminster" else borough.upper()
+    )
+
+    for offset in range(0, rows, chunksize):
+        n = min(chunksize, rows - offset)
+        rng = np.random.default_rng([seed, offset, _borough_index(borough)])
+        if len(pool) > 1:
+            sale = pool.iloc[_zipf_choice(rng, len(pool), n, a=.6)]
+        else:
+            sale = pool.iloc[np.zeros(n, int)]
+
+        days = rng.integers(first, last + 1, n)
+        years = (days - first) / 365.25
+        factor = sale["property_type"].map(PRICE_FACTOR).to_numpy()
+        price = (
+            sale["level"].to_numpy() * factor * 1.04 ** years
+            * rng.lognormal(0, .15, n)
+        ).round(-3)
+
+        base = (seed * len(RAW_FILES) + _borough_index(borough)) << 64
+        df = pd.DataFrame({
+            "unique_id": [
+                f"{{{base + i:032X}}}" for i in range(offset, offset + n)
+            ],
+            "price_paid": pd.array(price.astype("int64"), dtype="Int64"),
+            "deed_date": (
+                pd.to_datetime(days, unit="D").strftime("%Y-%m-%d")
+                .to_numpy(dtype=object)
+            ),
+            "postcode": sale["postcode"].to_numpy(),
+            "property_type": sale["property_type"].to_numpy(),
+            "new_build": np.where(rng.random(n) < .08, "Y", "N"),
+            "estate_type": sale["estate_type"].to_numpy(),
+            "saon": sale["saon"].to_numpy(),
+            "paon": sale["paon"].to_numpy(),
+            "street": sale["street"].to_numpy(),
+            "locality": None,
+            "town": "LONDON",
+            "district": district,
+            "county": "GREATER LONDON",
+            "transaction_category": np.where(
+                rng.random(n) < DIRTY["category_b"], "B", "A"
+            ),
+            "linked_data_uri": None,
+        })
+        yield _make_dirty(df, rng)
+
+
+def _make_dirty(df: pd.DataFrame, rng) -> pd.DataFrame:
+    n = len(df)
+    hit = {kind: rng.random(n) < p for kind, p in DIRTY.items()}
+    df.loc[hit["missing_price"], "price_paid"] = pd.NA
+    # text, so the column can hold the non-numeric prices
+    df["price_paid"] = df["price_paid"].astype(object)
+    df.loc[hit["bad_price"], "price_paid"] = rng.choice(
+        ["—", "abc", "1,250,000"], hit["bad_price"].sum()
+    )
+    df.loc[hit["missing_postcode"], "postcode"] = None
+    df.loc[hit["bad_date"], "deed_date"] = rng.choice(
+        ["", "31/02/2020", "N/A"], hit["bad_date"].sum()
+    )
+    padded = hit["padded_address"]
+    df.loc[padded, "paon"] = " " + df.loc[padded, "paon"] + " "
+    df.loc[padded & df["saon"].isna(), "saon"] = "  "
+    # the same sale registered again under a new id, right after the original
+    dupes = df[hit["duplicate_sale"]].assign(
+        unique_id=lambda d: "{" + d["unique_id"].str[1:-1].str[::-1] + "}"
+    )
+    df = pd.concat([df, dupes]).sort_index(kind="stable")
+    return df.reset_index(drop=True)
+
+
+def write_raw_files(directory: str, rows: int, seed: int = 0, **kwargs) -> int:
+    """
+    Write RAW_FILES into directory with `rows` rows split over the boroughs.
+    :return: rows written (slightly more than asked: duplicate sales are extra)
+    """
+    os.makedirs(directory, exist_ok=True)
+    written = 0
+    for borough, filename in RAW_FILES.items():
+        path = os.path.join(directory, filename)
+        n = int(rows * BOROUGH_SHARE[borough])
+        for i, chunk in enumerate(generate_ppd(n, borough, seed, **kwargs)):
+            chunk.to_csv(
+                path, mode="w" if i == 0 else "a", header=i == 0, index=False
+            )
+            written += len(chunk)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="data/bench")
+    args = parser.parse_args()
+
+    written = write_raw_files(args.out, args.rows, args.seed)
+    print(f"Wrote {written} rows to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,19 @@
 import pandas as pd
-from etl.extract.extract_house_prices import extract_house_prices
+from typing import Iterable, Iterator, Optional, Union
+from etl.extract.extract_house_prices import (
+    extract_house_prices,
+    extract_house_prices_chunks,
+    extract_monthly_update,
+)
 
-def extract_data() -> pd.DataFrame:
-    return extract_house_prices()
\ No newline at end of file
+def extract_data(
+    chunksize: Optional[int] = None,
+    boroughs: Optional[Iterable[str]] = None,
+) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+    # like pd.read_csv: a chunksize turns the result into an iterator of frames
+    if chunksize:
+        return extract_house_prices_chunks(chunksize)
+    return extract_house_prices(boroughs=boroughs)
+
+def extract_monthly_data(path: str) -> pd.DataFrame:
+    return extract_monthly_update(path)
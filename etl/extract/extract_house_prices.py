@@ -2,8 +2,11 @@ import os
 import timeit
 import pandas as pd
 import logging
-from typing import List
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional
 from utils.logging_utils import setup_logger, log_extract_success
+from utils.file_utils import file_fingerprint
+from utils.date_utils import parse_dates
 
 
 # creates a module-level logger named after the module (etl.extract.extract_house_prices)
@@ -23,21 +26,135 @@ RAW_FILES = {
     "Westminster":  "unclean_westminster.csv",
 }
 
+RAW_DIR = os.path.join(os.path.dirname(__file__), "../../data/raw")
 
-def _load_one(borough: str, filename: str) -> pd.DataFrame:
-    path = os.path.join(os.path.dirname(__file__), "../../data/raw", filename)
-    df = pd.read_csv(path)
+# explicit schema for the Land Registry PPD columns, so pandas does not have
+# to infer every dtype (and numeric-looking paon/saon values stay as text).
+# price_paid is read as text too: a dirty value such as "—" must not fail the
+# read, standardise_types coerces it to NaN. Columns that are not in a file
+# are simply ignored by the reader.
+RAW_DTYPES = {
+    "unique_id":            str,
+    "price_paid":           str,
+    "postcode":             str,
+    "property_type":        str,
+    "new_build":            str,
+    "estate_type":          str,
+    "saon":                 str,
+    "paon":                 str,
+    "street":               str,
+    "locality":             str,
+    "town":                 str,
+    "district":             str,
+    "county":               str,
+    "transaction_category": str,
+    "linked_data_uri":      str,
+    "record_status":        str,
+}
+
+# column order of the header-less bulk PPD files (complete / yearly /
+# monthly update)
+PPD_COLUMNS = [
+    "unique_id", "price_paid", "deed_date", "postcode", "property_type",
+    "new_build", "estate_type", "paon", "saon", "street", "locality",
+    "town", "district", "county", "transaction_category", "record_status",
+]
+
+# bulk files carry the local authority district, not our borough label
+DISTRICT_TO_BOROUGH = {borough.upper(): borough for borough in RAW_FILES}
+DISTRICT_TO_BOROUGH["CITY OF WESTMINSTER"] = "Westminster"
+
+# parsed after reading with the explicit DATE_FORMATS; bad values become NaT
+PARSE_DATES = ["deed_date"]
+
+CSV_ENGINES = ("c", "pyarrow")
+EXECUTORS = {"thread": ThreadPoolExecutor, "process": ProcessPoolExecutor}
+
+
+def _read_csv_arrow(path: str) -> pd.DataFrame:
+    import pyarrow as pa
+    from pyarrow import csv
+
+    table = csv.read_csv(
+        path,
+        convert_options=csv.ConvertOptions(
+            column_types={col: pa.string() for col in RAW_DTYPES},
+            strings_can_be_null=True,
+        ),
+    )
+    return table.to_pandas()
+
+
+def _parse_dates(df: pd.DataFrame) -> pd.DataFrame:
+    for col in df.columns.intersection(PARSE_DATES):
+        df[col], failed = parse_dates(df[col])
+        if len(failed):
+            logger.warning(
+                "Unparseable %s in %d rows (%d distinct, e.g. %s)", col,
+                failed.sum(), len(failed),
+                ", ".join(map(repr, failed.index[:5])),
+            )
+    return df
+
+
+def _prepare(df: pd.DataFrame, borough: str) -> pd.DataFrame:
+    df = _parse_dates(df)
     df["borough"] = borough
     return df
 
 
-def extract_house_prices() -> pd.DataFrame:
+def _load_one(borough: str, filename: str,
+              csv_engine: str = "c") -> pd.DataFrame:
+    path = os.path.join(RAW_DIR, filename)
+    if csv_engine == "pyarrow":
+        df = _read_csv_arrow(path)
+    else:
+        df = pd.read_csv(path, dtype=RAW_DTYPES)
+    return _prepare(df, borough)
+
+
+def raw_file_fingerprints() -> Dict[str, str]:
+    """Content fingerprint of every borough file in RAW_FILES."""
+    return {
+        borough: file_fingerprint(os.path.join(RAW_DIR, filename))
+        for borough, filename in RAW_FILES.items()
+    }
+
+
+def extract_house_prices(
+    max_workers: Optional[int] = None,
+    executor: str = "thread",
+    csv_engine: str = "c",
+    boroughs: Optional[Iterable[str]] = None,
+) -> pd.DataFrame:
+    """
+    Read every borough file in RAW_FILES in parallel and stack them.
+    :param max_workers: files read at the same time (default
+        EXTRACT_MAX_WORKERS, one per core)
+    :param executor: "thread" or "process" pool
+    :param csv_engine: "c" (pandas) or "pyarrow" CSV reader
+    :param boroughs: only read these boroughs (default all of RAW_FILES)
+    """
     try:
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unknown executor: {executor}")
+        if csv_engine not in CSV_ENGINES:
+            raise ValueError(f"Unknown CSV engine: {csv_engine}")
+        files = {b: RAW_FILES[b] for b in (boroughs or RAW_FILES)}
+        max_workers = max_workers or int(
+            os.getenv("EXTRACT_MAX_WORKERS", os.cpu_count() or 1)
+        )
+        workers = min(max_workers, len(files))
+
         start_time = timeit.default_timer()
 
-        frames: List[pd.DataFrame] = [
-            _load_one(b, f) for b, f in RAW_FILES.items()
-        ]
+        with EXECUTORS[executor](max_workers=workers) as pool:
+            frames: List[pd.DataFrame] = list(pool.map(
+                _load_one,
+                files.keys(),
+                files.values(),
+                [csv_engine] * len(files),
+            ))
         combined = pd.concat(frames, ignore_index=True)
         extract_execution_time = timeit.default_timer() - start_time
         log_extract_success(
@@ -49,3 +166,61 @@ def extract_house_prices() -> pd.DataFrame:
         logger.setLevel(logging.ERROR)
         logger.error(f"Error to extract data: {e}")
         raise Exception(f"Error to extract data: {e}")
+
+
+def extract_house_prices_chunks(chunksize: int) -> Iterator[pd.DataFrame]:
+    """
+    Stream every borough file in RAW_FILES as DataFrames of at most
+    `chunksize` rows, so only one chunk is held in memory at a time.
+    """
+    try:
+        start_time = timeit.default_timer()
+        rows, cols = 0, 0
+
+        for borough, filename in RAW_FILES.items():
+            path = os.path.join(RAW_DIR, filename)
+            with pd.read_csv(
+                path, dtype=RAW_DTYPES, chunksize=chunksize
+            ) as reader:
+                for chunk in reader:
+                    chunk = _prepare(chunk, borough)
+                    rows, cols = rows + len(chunk), chunk.shape[1]
+                    yield chunk
+
+        extract_execution_time = timeit.default_timer() - start_time
+        log_extract_success(
+            logger, TYPE_DESCRIPTION, (rows, cols),
+            extract_execution_time, EXPECTED_PER_ROW
+        )
+    except Exception as e:
+        logger.setLevel(logging.ERROR)
+        logger.error(f"Error to extract data: {e}")
+        raise Exception(f"Error to extract data: {e}")
+
+
+def extract_monthly_update(path: str) -> pd.DataFrame:
+    """
+    Read a Land Registry monthly update file (header-less PPD layout with a
+    record_status column: A = add, C = change, D = delete) and keep the rows
+    for the boroughs in RAW_FILES.
+    """
+    try:
+        start_time = timeit.default_timer()
+
+        df = pd.read_csv(
+            path, header=None, names=PPD_COLUMNS, dtype=RAW_DTYPES
+        )
+        district = df["district"].str.upper()
+        df = df.assign(borough=district.map(DISTRICT_TO_BOROUGH))
+        df = _parse_dates(df[df["borough"].notna()].copy())
+
+        extract_execution_time = timeit.default_timer() - start_time
+        log_extract_success(
+            logger, "PPD monthly update (raw)", df.shape,
+            extract_execution_time, EXPECTED_PER_ROW
+        )
+        return df
+    except Exception as e:
+        logger.setLevel(logging.ERROR)
+        logger.error(f"Error to extract data: {e}")
+        raise Exception(f"Error to extract data: {e}")
@@ -0,0 +1,132 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Optional
+from utils.logging_utils import setup_logger
+
+logger = setup_logger(__name__, "etl_checkpoint.log", level=logging.INFO)
+
+# the stages of a full run, in order; extract and transform leave a Parquet
+# copy of their output
+STAGES = ["extract", "transform", "load", "enrich"]
+FRAME_STAGES = ["extract", "transform"]
+
+# one sub-directory per set of source files and pipeline version
+DEFAULT_CHECKPOINT_DIR = Path(__file__).parents[2] / ".cache" / "checkpoints"
+
+# the code and settings that shape the extract and transform output, with the
+# utils modules they import (directories stand for every .py file in them); a
+# change to any of them means older checkpoints no longer match what a run
+# would produce
+VERSIONED_CODE = [
+    Path(__file__).parents[1] / "extract",
+    Path(__file__).parents[1] / "transform",
+    Path(__file__).parents[2] / "utils" / "date_utils.py",
+    Path(__file__).parents[2] / "utils" / "text_utils.py",
+    Path(__file__).parents[2] / "utils" / "metrics_utils.py",
+]
+VERSIONED_SETTINGS = ["DEDUP_KEY"]
+
+# completed stages and the dtypes of their frames (Parquet widens
+# datetime64[s] to [ms])
+CHECKPOINT_META = "_stages.json"
+
+
+def pipeline_version() -> str:
+    """Hash of the VERSIONED_CODE files and the VERSIONED_SETTINGS set."""
+    files = sorted(
+        p for entry in VERSIONED_CODE
+        for p in (entry.glob("*.py") if entry.is_dir() else [entry])
+    )
+    digest = hashlib.sha256()
+    for path in files:
+        digest.update(path.read_bytes())
+    settings = {name: os.getenv(name, "") for name in VERSIONED_SETTINGS}
+    digest.update(json.dumps(settings).encode())
+    return digest.hexdigest()[:16]
+
+
+def open_checkpoint(fingerprints: Dict[str, str], directory: Path = None,
+                    version: str = None) -> Path:
+    """
+    Checkpoint directory for a run over source files with these fingerprints,
+    cleaned by this pipeline_version. Other checkpoints are removed: they can
+    never be resumed from again once the files or the code changed.
+    """
+    root = Path(
+        directory or os.getenv("CHECKPOINT_DIR", DEFAULT_CHECKPOINT_DIR)
+    )
+    inputs = {"files": fingerprints, "version": version or pipeline_version()}
+    digest = hashlib.sha256(json.dumps(inputs, sort_keys=True).encode())
+    key = digest.hexdigest()[:16]
+    path = root / key
+    if root.exists():
+        for other in root.iterdir():
+            if other.is_dir() and other != path:
+                shutil.rmtree(other, ignore_errors=True)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _meta(path: Path) -> dict:
+    try:
+        return json.loads((path / CHECKPOINT_META).read_text())
+    except FileNotFoundError:
+        return {"completed": [], "dtypes": {}}
+
+
+def _write_meta(path: Path, meta: dict) -> None:
+    tmp = path / f"{CHECKPOINT_META}.tmp"
+    tmp.write_text(json.dumps(meta, indent=2))
+    os.replace(tmp, path / CHECKPOINT_META)
+
+
+def mark_done(path: Path, stage: str, df: pd.DataFrame = None) -> None:
+    """
+    Record stage as completed; for the FRAME_STAGES, df is written first.
+    Completing a stage invalidates every later one.
+    """
+    meta = _meta(path)
+    if df is not None:
+        tmp = path / f"{stage}.parquet.tmp"
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, path / f"{stage}.parquet")
+        meta["dtypes"][stage] = {
+            col: str(dtype) for col, dtype in df.dtypes.items()
+        }
+    done = STAGES[:STAGES.index(stage)]
+    meta["completed"] = [s for s in meta["completed"] if s in done] + [stage]
+    _write_meta(path, meta)
+    logger.info("Checkpoint %s: %s done", path.name, stage)
+
+
+def completed_stages(path: Path) -> list:
+    return _meta(path)["completed"]
+
+
+def resume_stage(path: Path) -> Optional[str]:
+    """First stage that has not completed in order, None when all have."""
+    completed = completed_stages(path)
+    for stage in STAGES:
+        if stage not in completed:
+            return stage
+    return None
+
+
+def load_frame(path: Path, stage: str) -> pd.DataFrame:
+    """Output of a completed FRAME_STAGES stage, with its original dtypes."""
+    meta = _meta(path)
+    if stage not in meta["completed"]:
+        raise ValueError(
+            f"No {stage} checkpoint for these source files and code, "
+            f"start from an earlier stage"
+        )
+    df = pd.read_parquet(path / f"{stage}.parquet")
+    logger.info(
+        "Checkpoint %s: read %d rows of %s output", path.name, len(df), stage
+    )
+    return df.astype(meta["dtypes"][stage])
@@ -0,0 +1,141 @@
+import uuid
+import logging
+import pandas as pd
+from typing import Dict
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+from utils.logging_utils import setup_logger
+
+logger = setup_logger(__name__, "database_query.log", level=logging.INFO)
+
+# one row per borough: how far the target table is loaded and from which file
+STATE_TABLE = "etl_state"
+
+# the row of STATE_TABLE for the monthly update files, kept apart from the
+# borough rows: a monthly file says nothing about which borough files were
+# loaded
+MONTHLY_UPDATE = "monthly_update"
+
+# one row per successful load; the dashboard keys its caches on the latest
+# version
+VERSION_TABLE = "dataset_version"
+
+
+def _ensure_state_table(conn) -> None:
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+          borough            TEXT PRIMARY KEY,
+          max_date           DATE,
+          source_fingerprint TEXT,
+          updated_at         TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+    """))
+
+
+def _ensure_version_table(conn) -> None:
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (
+          version    BIGSERIAL PRIMARY KEY,
+          run_id     TEXT NOT NULL,
+          row_count  BIGINT NOT NULL,
+          max_date   DATE,
+          loaded_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+    """))
+
+
+def load_etl_state(engine) -> Dict[str, dict]:
+    """
+    Read the per-borough watermark and source fingerprint.
+    :return: {borough: {"max_date": date, "source_fingerprint": str}}
+    """
+    with engine.begin() as conn:
+        _ensure_state_table(conn)
+        rows = conn.execute(text(
+            f"SELECT borough, max_date, source_fingerprint FROM {STATE_TABLE};"
+        )).mappings().all()
+    return {
+        r["borough"]: {
+            "max_date": r["max_date"],
+            "source_fingerprint": r["source_fingerprint"],
+        }
+        for r in rows
+    }
+
+
+def save_etl_state(engine, state: Dict[str, dict]) -> None:
+    """Upsert the watermark / fingerprint of every borough in `state`."""
+    if not state:
+        return
+    with engine.begin() as conn:
+        _ensure_state_table(conn)
+        conn.execute(
+            text(f"""
+                INSERT INTO {STATE_TABLE}
+                  (borough, max_date, source_fingerprint)
+                VALUES (:borough, :max_date, :source_fingerprint)
+                ON CONFLICT (borough) DO UPDATE
+                SET max_date = GREATEST(
+                      {STATE_TABLE}.max_date, EXCLUDED.max_date
+                    ),
+                    source_fingerprint = COALESCE(
+                      EXCLUDED.source_fingerprint,
+                      {STATE_TABLE}.source_fingerprint
+                    ),
+                    updated_at = now();
+            """),
+            [{"borough": b, **s} for b, s in state.items()],
+        )
+    logger.info("Saved ETL state for %s", ", ".join(sorted(state)))
+
+
+def update_watermarks(watermarks: Dict[str, object], df: pd.DataFrame) -> None:
+    """Fold the max cleaned `date` per borough of df into watermarks."""
+    if df.empty:
+        return
+    maxima = df.groupby("borough", observed=True)["date"].max()
+    for borough, max_date in maxima.items():
+        current = watermarks.get(borough)
+        watermarks[borough] = (
+            max_date if current is None else max(current, max_date)
+        )
+
+
+def changed_boroughs(state: Dict[str, dict],
+                     fingerprints: Dict[str, str]) -> list:
+    """Boroughs whose source file differs from the one last loaded."""
+    return [
+        borough for borough, fingerprint in fingerprints.items()
+        if state.get(borough, {}).get("source_fingerprint") != fingerprint
+    ]
+
+
+def record_dataset_version(engine, table: str, run_id: str = None) -> int:
+    """
+    Stamp a finished load of `table` with a new, strictly increasing version
+    (plus the run id, row count and max date it describes).
+    :return: the new version
+    """
+    with engine.begin() as conn:
+        _ensure_version_table(conn)
+        version = conn.execute(
+            text(f"""
+                INSERT INTO {VERSION_TABLE} (run_id, row_count, max_date)
+                SELECT :run_id, COUNT(*), MAX(date) FROM {table}
+                RETURNING version;
+            """),
+            {"run_id": run_id or uuid.uuid4().hex},
+        ).scalar()
+    logger.info("Recorded dataset version %d of %s", version, table)
+    return version
+
+
+def load_dataset_version(engine) -> int:
+    """Latest dataset version, 0 before the first recorded load."""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(
+                text(f"SELECT COALESCE(MAX(version), 0) FROM {VERSION_TABLE};")
+            ).scalar()
+    except ProgrammingError:
+        return 0
@@ -1,54 +1,260 @@
+import io
 import os
+import timeit
 import pandas as pd
 import logging
-from sqlalchemy import text, Table, MetaData
-from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.dialects.postgresql import insert
-from sqlalchemy.orm import sessionmaker
+from typing import Iterable
+from sqlalchemy import text
+from sqlalchemy.types import Date, Text
 from etl.config.db_config import load_db_config, DatabaseConfigError
-from utils.db_utils import create_db_engine, DatabaseConnectionError
-from utils.logging_utils import setup_logger
-from utils.sql_utils import import_sql_query
-from etl.load.post_load_enrichment import enrich_database
+from utils.db_utils import get_db_engine, DatabaseConnectionError
+from utils.logging_utils import setup_logger, log_load_success
+from etl.load.post_load_enrichment import (
+    enrich_database, prepare_table, swap_in_table,
+)
+from etl.load.etl_state import record_dataset_version
 
 TARGET_TABLE = "emily_capstone"
 
+# the new data is built here and only swapped in once it is fully indexed
+STAGING_TABLE = f"{TARGET_TABLE}_staging"
+
+#  this is a readable description of the data type
+TYPE_DESCRIPTION = "HOUSE-PRICE table (clean)"
+
+# unique key of a sale used by upserts: the transform's 64-bit row hash of the
+# business key, so re-loading a sale is idempotent even under a new id
+UPSERT_KEY = "row_hash"
+
+# PPD transaction unique identifier: monthly D records delete by it, and an
+# upserted row also replaces an older version of its record (C changes)
+ID_KEY = "transaction_id"
+
+# the table is range-partitioned on this column, one partition per year
+PARTITION_COLUMN = "date"
+
+
 # Configure the logger
 logger = setup_logger(__name__, "database_query.log", level=logging.INFO)
 
 
-def load_data(df_clean: pd.DataFrame) -> None:
+def load_data(df_clean: pd.DataFrame, enrich: bool = True) -> None:
+    """
+    Load the clean frame without the dashboard ever seeing a missing
+    or half-indexed table (see _load_via_staging).
+    With enrich=False the post-load step is left to enrich_loaded_table,
+    so a failure there can be retried without loading again.
+    """
+    _load_via_staging([df_clean], enrich)
+
+
+def load_data_chunks(chunks: Iterable[pd.DataFrame]) -> None:
+    """
+    Streaming variant of load_data for bounded memory: each cleaned chunk
+    is COPYed into the staging table as it arrives.
+    """
+    _load_via_staging(chunks)
+
+
+def upsert_data(df_clean: pd.DataFrame) -> None:
+    """
+    Incremental load: insert new rows and replace the ones already loaded,
+    keyed on the row hash (and transaction_id), then run post-load enrichment.
+    """
+    if UPSERT_KEY not in df_clean:
+        raise ValueError(f"Incremental loads need a {UPSERT_KEY} column")
+    schema = os.getenv("TARGET_DB_SCHEMA", "public")
+    try:
+        cfg = load_db_config()["target_database"]
+        engine = get_db_engine(cfg)
+        start_time = timeit.default_timer()
+
+        _upsert(df_clean, engine, schema)
+        log_load_success(
+            logger, TYPE_DESCRIPTION, len(df_clean),
+            timeit.default_timer() - start_time
+        )
+
+    except (DatabaseConfigError, DatabaseConnectionError) as e:
+        logger.error("DB config/connection problem: %s", e)
+        raise
+
+    except Exception as e:
+        logger.error("Unexpected error in upsert_data: %s", e)
+        raise
+
+    enrich_database(schema, engine)
+    record_dataset_version(engine, f"{schema}.{TARGET_TABLE}")
+
+
+def load_year(df_clean: pd.DataFrame, year: int) -> None:
+    """
+    Reload a single year: TRUNCATE its partition and COPY that year's rows
+    back in, in one transaction. The other partitions are not touched.
+    """
+    schema = os.getenv("TARGET_DB_SCHEMA", "public")
+    df = df_clean[pd.to_datetime(df_clean[PARTITION_COLUMN]).dt.year == year]
+    partition = f"{schema}.{_partition_name(TARGET_TABLE, year)}"
+    try:
+        cfg = load_db_config()["target_database"]
+        engine = get_db_engine(cfg)
+        start_time = timeit.default_timer()
+
+        raw = engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            if not _is_partitioned(cursor, schema, TARGET_TABLE):
+                raise ValueError(
+                    f"{TARGET_TABLE} is not partitioned, run a full load first"
+                )
+            _ensure_partitions(cursor, schema, TARGET_TABLE, [year])
+            cursor.execute(f"TRUNCATE {partition};")
+            _copy_frame(
+                df.sort_values(PARTITION_COLUMN, kind="stable"), cursor,
+                partition,
+            )
+            raw.commit()
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+
+        with engine.begin() as conn:
+            conn.execute(text(f"ANALYZE {partition};"))
+        log_load_success(
+            logger, f"{TYPE_DESCRIPTION} {year}", len(df),
+            timeit.default_timer() - start_time
+        )
+
+    except (DatabaseConfigError, DatabaseConnectionError) as e:
+        logger.error("DB config/connection problem: %s", e)
+        raise
+
+    except Exception as e:
+        logger.error("Unexpected error in load_year: %s", e)
+        raise
+
+    enrich_database(schema, engine)
+    record_dataset_version(engine, f"{schema}.{TARGET_TABLE}")
+
+
+def apply_deltas(df_upserts: pd.DataFrame, delete_keys: pd.Series) -> None:
+    """
+    Apply a PPD monthly update in one transaction: batched deletes for the
+    D (and no longer valid) transaction ids, then an upsert of the A/C rows.
+    """
+    schema = os.getenv("TARGET_DB_SCHEMA", "public")
+    try:
+        cfg = load_db_config()["target_database"]
+        engine = get_db_engine(cfg)
+        start_time = timeit.default_timer()
+
+        raw = engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            deleted = _delete_keys(delete_keys, cursor, schema)
+            if not df_upserts.empty:
+                _upsert_rows(df_upserts, cursor, schema)
+            raw.commit()
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+
+        logger.info(
+            "Deleted %d rows, upserted %d rows", deleted, len(df_upserts)
+        )
+        log_load_success(
+            logger, TYPE_DESCRIPTION, len(df_upserts) + len(delete_keys),
+            timeit.default_timer() - start_time
+        )
+
+    except (DatabaseConfigError, DatabaseConnectionError) as e:
+        logger.error("DB config/connection problem: %s", e)
+        raise
+
+    except Exception as e:
+        logger.error("Unexpected error in apply_deltas: %s", e)
+        raise
+
+    enrich_database(schema, engine)
+    record_dataset_version(engine, f"{schema}.{TARGET_TABLE}")
+
+
+def enrich_loaded_table() -> None:
+    """
+    Post-load enrichment and a new dataset version after
+    load_data(enrich=False).
+    """
+    schema = os.getenv("TARGET_DB_SCHEMA", "public")
+    engine = get_db_engine(load_db_config()["target_database"])
+    # the flips view came with the swap
+    enrich_database(schema, engine, refresh_flips=False)
+    record_dataset_version(engine, f"{schema}.{TARGET_TABLE}")
+
+
+def _load_via_staging(frames: Iterable[pd.DataFrame],
+                      enrich: bool = True) -> None:
     """
-    1) Drop any existing clean_house_prices table (cascade to drop dependents)
-    2) Create fresh via pandas.to_sql(if_exists='fail')
-    3) If it still exists, fall back to an INSERT … ON CONFLICT DO NOTHING
-    4) Run post-load enrichment (indexes + views)
+    1) Drop any leftover staging table
+    2) Create it fresh (partitioned by year) from the first frame's columns
+       and COPY every frame in, date-sorted so the BRIN index on date stays
+       tight
+    3) Build the indexes and ANALYZE the staging table
+    4) Swap it in for the live table (and re-create the views) in one
+       transaction
+    5) Run post-load enrichment and record the new dataset version (if enrich)
     """
     schema = os.getenv("TARGET_DB_SCHEMA", "public")
     try:
-        # load connection info and build an Engine
+        # load connection info and get the shared Engine
         cfg = load_db_config()["target_database"]
-        engine = create_db_engine(cfg)
+        engine = get_db_engine(cfg)
+        start_time = timeit.default_timer()
 
-        # 1) DROP old table + dependent views/indexes, committed immediately
+        # 1) DROP old staging table, committed immediately
         with engine.begin() as conn:
-            conn.execute(text(f"DROP TABLE IF EXISTS {schema}.{TARGET_TABLE} CASCADE;"))
-            logger.info("Dropped old table (and dependents) if it existed: %s", TARGET_TABLE)
-
-        # 2) Try to create brand-new table
-        df_clean.to_sql(
-            TARGET_TABLE,
-            engine,
-            if_exists="fail",  # raises ValueError if table still exists
-            index=False,
-            schema=schema
+            conn.execute(text(
+                f"DROP TABLE IF EXISTS {schema}.{STAGING_TABLE} CASCADE;"
+            ))
+            logger.info(
+                "Dropped old staging table if it existed: %s", STAGING_TABLE
+            )
+
+        # 2) create the staging table, then COPY the rows in
+        total = 0
+        for df in frames:
+            if not total:
+                _create_table(df, engine, schema, STAGING_TABLE)
+            _copy_into(
+                df.sort_values(PARTITION_COLUMN, kind="stable"), engine,
+                schema, STAGING_TABLE,
+            )
+            total += len(df)
+            logger.info(
+                "Copied %d rows into %s (%d so far)",
+                len(df), STAGING_TABLE, total,
+            )
+
+        if not total:
+            logger.warning(
+                "No rows to load, keeping the current %s", TARGET_TABLE
+            )
+            return
+
+        log_load_success(
+            logger, TYPE_DESCRIPTION, total,
+            timeit.default_timer() - start_time
         )
-        logger.info("Created table %s with %d rows", TARGET_TABLE, len(df_clean))
 
-    except ValueError:
-        # 3) Table still exists → bulk insert, skipping duplicates
-        logger.warning("%s already exists, inserting new rows only (DO NOTHING on conflict)", TARGET_TABLE)
-        _insert_ignore_duplicates(df_clean, engine)
+        # 3) indexes + statistics while nobody is reading the table yet
+        prepare_table(schema, engine, STAGING_TABLE)
+
+        # 4) atomic swap
+        swap_in_table(schema, engine, STAGING_TABLE)
+        logger.info("Loaded table %s with %d rows", TARGET_TABLE, total)
 
     except (DatabaseConfigError, DatabaseConnectionError) as e:
         logger.error("DB config/connection problem: %s", e)
@@ -58,34 +264,164 @@ def load_data(df_clean: pd.DataFrame) -> None:
         logger.error("Unexpected error in load_data: %s", e)
         raise
 
-    # 4) Post-load enrichment (indexes & views)
+    # 5) Post-load enrichment (indexes, views & rollups)
+    if enrich:
+        enrich_loaded_table()
 
-    enrich_database(schema, engine)
+
+def _create_table(df: pd.DataFrame, engine, schema: str,
+                  table: str = TARGET_TABLE):
+    """
+    Create an empty table with the frame's columns and SQL types, range
+    partitioned by year on PARTITION_COLUMN (partitions are added as rows
+    arrive, see _ensure_partitions).
+    Types are inferred from a sample of rows (an empty frame would turn
+    object columns into TEXT), with the transform's compact dtypes mapped
+    by _sql_types.
+    """
+    ddl = pd.io.sql.get_schema(
+        df.head(1000), table, con=engine, schema=schema, dtype=_sql_types(df)
+    )
+    with engine.begin() as conn:
+        conn.execute(text(f'{ddl} PARTITION BY RANGE ("{PARTITION_COLUMN}")'))
 
 
-def _insert_ignore_duplicates(df: pd.DataFrame, conn):
+def _sql_types(df: pd.DataFrame) -> dict:
     """
-    Insert every row from df; skip those that already exist.
-    Assumes the table has a composite primary key on (date, postcode, price, borough)
-    or another suitable unique constraint.
+    SQL types for the dtypes pandas would otherwise map wrongly: the cleaned
+    dates are day-precision datetime64 (→ DATE, not TIMESTAMP) and categories
+    hold text. Int64 → BIGINT and boolean → BOOLEAN need no help.
     """
-    metadata = MetaData()
-    table = Table(TARGET_TABLE, metadata, autoload_with=conn)
-    rows = df.to_dict(orient="records")
+    types = {}
+    for col, dtype in df.dtypes.items():
+        if pd.api.types.is_datetime64_dtype(dtype):
+            types[col] = Date()
+        elif isinstance(dtype, pd.CategoricalDtype):
+            types[col] = Text()
+    return types
+
+
+def _partition_name(table: str, year: int) -> str:
+    return f"{table}_y{year}"
+
+
+def _years(df: pd.DataFrame) -> list:
+    years = pd.to_datetime(df[PARTITION_COLUMN]).dt.year
+    return sorted(years.unique().tolist())
+
+
+def _is_partitioned(cursor, schema: str, table: str) -> bool:
+    cursor.execute(
+        "SELECT 1 FROM pg_partitioned_table "
+        "WHERE partrelid = to_regclass(%s);",
+        (f"{schema}.{table}",),
+    )
+    return cursor.fetchone() is not None
+
+
+def _ensure_partitions(cursor, schema: str, table: str, years) -> None:
+    """Create (and so attach) the yearly partitions of schema.table."""
+    for year in years:
+        partition = _partition_name(table, year)
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {schema}.{partition} "
+            f"PARTITION OF {schema}.{table} "
+            f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01');"
+        )
+
+
+def _copy_into(df: pd.DataFrame, engine, schema: str,
+               table: str = TARGET_TABLE):
+    """COPY df into schema.table on one connection and commit."""
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        if PARTITION_COLUMN in df and _is_partitioned(cursor, schema, table):
+            _ensure_partitions(cursor, schema, table, _years(df))
+        _copy_frame(df, cursor, f"{schema}.{table}")
+        raw.commit()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
 
-    insert_stmt = insert(table).values(rows)
-    insert_stmt = insert_stmt.on_conflict_do_nothing()   # ← skip duplicates
 
+def _copy_frame(df: pd.DataFrame, cursor, qualified_table: str,
+                batch_size: int = None) -> None:
+    """
+    Stream df through COPY ... FROM STDIN (psycopg2 copy_expert),
+    batch_size rows at a time from an in-memory CSV buffer.
+    Empty fields (NaN / None) arrive as NULL.
+    """
+    batch_size = batch_size or int(os.getenv("LOAD_BATCH_SIZE", "100000"))
+    columns = ", ".join(f'"{c}"' for c in df.columns)
+    copy_sql = (
+        f"COPY {qualified_table} ({columns}) FROM STDIN WITH (FORMAT csv)"
+    )
+    for start in range(0, len(df), batch_size):
+        buffer = io.StringIO()
+        df.iloc[start:start + batch_size].to_csv(
+            buffer, index=False, header=False, date_format="%Y-%m-%d"
+        )
+        buffer.seek(0)
+        cursor.copy_expert(copy_sql, buffer)
 
-    Session = sessionmaker(bind=conn)
-    session = Session()
+
+def _upsert(df: pd.DataFrame, engine, schema: str):
+    """Upsert df on its own connection and commit."""
+    raw = engine.raw_connection()
     try:
-        session.execute(insert_stmt)
-        session.commit()
-        logger.info("Inserted %d rows (duplicates ignored)", len(rows))
-    except SQLAlchemyError as e:
-        session.rollback()
-        logger.error("Bulk insert failed: %s", e)
+        _upsert_rows(df, raw.cursor(), schema)
+        raw.commit()
+        logger.info("Upserted %d rows on %s", len(df), UPSERT_KEY)
+    except Exception as e:
+        raw.rollback()
+        logger.error("Bulk upsert failed: %s", e)
         raise
     finally:
-        session.close()
+        raw.close()
+
+
+def _upsert_rows(df: pd.DataFrame, cursor, schema: str,
+                 keys=(UPSERT_KEY, ID_KEY)):
+    """
+    Insert every row from df, replacing the rows that match it on any of
+    `keys` (the same sale by row hash, or an older version of the record
+    by transaction_id). Rows are COPYed into a temp table, the old versions
+    deleted and the new ones inserted in the caller's transaction. A unique
+    index on a table partitioned by date would have to include the date, and
+    a corrected record may move year, so ON CONFLICT is not an option here.
+    """
+    columns = ", ".join(f'"{c}"' for c in df.columns)
+    cursor.execute(
+        f"CREATE TEMP TABLE tmp_{TARGET_TABLE} "
+        f"(LIKE {schema}.{TARGET_TABLE} INCLUDING DEFAULTS) ON COMMIT DROP;"
+    )
+    _copy_frame(df, cursor, f"tmp_{TARGET_TABLE}")
+    if _is_partitioned(cursor, schema, TARGET_TABLE):
+        _ensure_partitions(cursor, schema, TARGET_TABLE, _years(df))
+    for key in (k for k in keys if k in df):
+        cursor.execute(
+            f"DELETE FROM {schema}.{TARGET_TABLE} t "
+            f"USING tmp_{TARGET_TABLE} s WHERE t.{key} = s.{key};"
+        )
+    cursor.execute(
+        f"INSERT INTO {schema}.{TARGET_TABLE} ({columns}) "
+        f"SELECT {columns} FROM tmp_{TARGET_TABLE};"
+    )
+
+
+def _delete_keys(keys: pd.Series, cursor, schema: str, key: str = ID_KEY,
+                 batch_size: int = None) -> int:
+    """DELETE the rows whose key is in `keys`, batch_size keys a statement."""
+    batch_size = batch_size or int(os.getenv("LOAD_BATCH_SIZE", "100000"))
+    deleted = 0
+    values = keys.tolist()
+    for start in range(0, len(values), batch_size):
+        cursor.execute(
+            f"DELETE FROM {schema}.{TARGET_TABLE} WHERE {key} = ANY(%s);",
+            (values[start:start + batch_size],),
+        )
+        deleted += cursor.rowcount
+    return deleted
@@ -2,7 +2,7 @@ import logging
 from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
 from etl.config.db_config import load_db_config
-from utils.db_utils import create_db_engine
+from utils.db_utils import get_db_engine
 from utils.logging_utils import setup_logger
 from utils.sql_utils import import_sql_query
 from pathlib import Path
@@ -13,14 +13,27 @@ logger = setup_logger(__name__, "database_query.log", level=logging.DEBUG)
 
 TARGET_TABLE = "emily_capstone"
 
+# repeat-sale flips, materialised so the Property Flips page reads an index
+FLIPS_VIEW = "mv_flips_24m"
 
-def enrich_database(schema: str = 'public', engine=None):
-    engine = create_db_engine(load_db_config()["target_database"])
+
+def enrich_database(schema: str = 'public', engine=None,
+                    refresh_flips: bool = True):
+    """
+    Indexes, views and derived tables on the live table.
+    :param refresh_flips: refresh the flips view (CONCURRENTLY, so the page
+    keeps reading the old rows meanwhile); skipped right after a table swap,
+    which already brought a freshly built one.
+    """
+    engine = engine or get_db_engine(load_db_config()["target_database"])
     Session = sessionmaker(bind=engine)
     session = Session()
     try:
         _apply_indexes(session)
         _create_views(session)
+        if refresh_flips:
+            _refresh_flips(session)
+        _build_rollups(session)
         session.commit()
     except Exception as e:
         session.rollback()
@@ -30,17 +43,156 @@ def enrich_database(schema: str = 'public', engine=None):
         session.close()
 
 
-def _apply_indexes(session):
-    #  speed up lookups in Streamlit where you filter or group by postcode, date or borough
-    index_sql = [
-        f'CREATE INDEX IF NOT EXISTS idx_{TARGET_TABLE}_postcode ON {TARGET_TABLE}(postcode);',
-        f'CREATE INDEX IF NOT EXISTS idx_{TARGET_TABLE}_date     ON {TARGET_TABLE}(date);',
-        f'CREATE INDEX IF NOT EXISTS idx_{TARGET_TABLE}_borough  ON {TARGET_TABLE}(borough);',
-    ]
-    for sql in index_sql:
+# speed up lookups in Streamlit where you filter or group by postcode, its
+# parts, date or borough
+INDEX_COLUMNS = [
+    "postcode", "outcode", "postcode_sector", "postcode_area", "borough",
+]
+
+# rows arrive roughly in date order, so a BRIN index covers date ranges at a
+# fraction of a btree's size (partition pruning does the coarse work)
+BRIN_INDEX_COLUMNS = ["date"]
+
+# columns searched with LIKE 'prefix%'; text_pattern_ops makes the btree
+# usable for that whatever the database collation is
+PREFIX_INDEX_COLUMNS = ["postcode"]
+
+# the keys the incremental / monthly upserts look rows up by (row_hash from
+# the transform, transaction_id when the source had ids). A unique index on a
+# date-partitioned table has to include date, so these only stop two rows
+# sharing a key on the same date; across dates the key stays unique because
+# load._upsert_rows deletes every row with the key, whatever its date, before
+# inserting, and the transform drops duplicate keys within a load
+UNIQUE_KEY_COLUMNS = ["row_hash", "transaction_id"]
+
+
+def prepare_table(schema: str, engine, table: str):
+    """
+    Build the indexes, collect planner statistics and materialise the
+    flips view of a (staging) table before anything reads from it.
+    """
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    try:
+        _apply_indexes(session, table)
+        session.execute(text(f"ANALYZE {schema}.{table};"))
+        logger.info("Analyzed %s.%s", schema, table)
+        _build_flips(session, table)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        logger.error("Preparing %s failed: %s", table, e)
+        raise
+    finally:
+        session.close()
+
+
+def swap_in_table(schema: str, engine, staging_table: str):
+    """
+    Replace TARGET_TABLE with a fully indexed staging table in one
+    transaction: drop the live table, rename the staging table, its yearly
+    partitions, its flips view and all their indexes into place and
+    re-create the views on top of it.
+    Readers see either the old table or the new one, never neither.
+    """
+    staging_flips = _flips_view_for(staging_table)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    try:
+        partitions = [
+            (partition, partition.replace(staging_table, TARGET_TABLE))
+            for partition in _partitions(session, schema, staging_table)
+        ]
+        indexes = _index_renames(session, schema, staging_table, TARGET_TABLE)
+        for partition, new_name in partitions:
+            indexes += _index_renames(session, schema, partition, new_name)
+        indexes += _index_renames(session, schema, staging_flips, FLIPS_VIEW)
+        session.execute(text(
+            f"DROP TABLE IF EXISTS {schema}.{TARGET_TABLE} CASCADE;"
+        ))
+        session.execute(text(
+            f"ALTER TABLE {schema}.{staging_table} RENAME TO {TARGET_TABLE};"
+        ))
+        for partition, new_name in partitions:
+            session.execute(text(
+                f"ALTER TABLE {schema}.{partition} RENAME TO {new_name};"
+            ))
+        session.execute(text(
+            f"ALTER MATERIALIZED VIEW {schema}.{staging_flips} "
+            f"RENAME TO {FLIPS_VIEW};"
+        ))
+        for index, new_name in indexes:
+            session.execute(text(
+                f"ALTER INDEX {schema}.{index} RENAME TO {new_name};"
+            ))
+        _create_views(session)
+        session.commit()
+        logger.info("Swapped %s in as %s", staging_table, TARGET_TABLE)
+    except Exception as e:
+        session.rollback()
+        logger.error("Table swap failed: %s", e)
+        raise
+    finally:
+        session.close()
+
+
+def _index_renames(session, schema: str, relation: str, new_name: str) -> list:
+    """(index, renamed index) for every index on relation."""
+    indexes = session.execute(
+        text("SELECT indexname FROM pg_indexes "
+             "WHERE schemaname = :schema AND tablename = :table"),
+        {"schema": schema, "table": relation},
+    ).scalars().all()
+    return [(index, index.replace(relation, new_name)) for index in indexes]
+
+
+def _partitions(session, schema: str, table: str) -> list:
+    """Names of the partitions attached to schema.table."""
+    return session.execute(
+        text("SELECT c.relname FROM pg_inherits i "
+             "JOIN pg_class c ON c.oid = i.inhrelid "
+             "WHERE i.inhparent = to_regclass(:table) ORDER BY c.relname"),
+        {"table": f"{schema}.{table}"},
+    ).scalars().all()
+
+
+def _apply_indexes(session, table: str = TARGET_TABLE):
+    for col in INDEX_COLUMNS:
+        sql = (f'CREATE INDEX IF NOT EXISTS idx_{table}_{col} '
+               f'ON {table}({col});')
+        session.execute(text(sql))
+        logger.info("Index applied: %s", sql.split('ON')[0].strip())
+
+    for col in BRIN_INDEX_COLUMNS:
+        sql = (f'CREATE INDEX IF NOT EXISTS idx_{table}_{col} '
+               f'ON {table} USING brin ({col});')
+        session.execute(text(sql))
+        logger.info("Index applied: %s", sql.split('ON')[0].strip())
+
+    for col in PREFIX_INDEX_COLUMNS:
+        sql = (f'CREATE INDEX IF NOT EXISTS idx_{table}_{col}_prefix '
+               f'ON {table}({col} text_pattern_ops);')
         session.execute(text(sql))
         logger.info("Index applied: %s", sql.split('ON')[0].strip())
 
+    for col in UNIQUE_KEY_COLUMNS:
+        if _has_column(session, table, col):
+            # replaces the plain index earlier versions built under this name
+            session.execute(text(f'DROP INDEX IF EXISTS idx_{table}_{col};'))
+            sql = (f'CREATE UNIQUE INDEX IF NOT EXISTS uq_{table}_{col} '
+                   f'ON {table}({col}, "date");')
+            session.execute(text(sql))
+            logger.info("Index applied: %s", sql.split('ON')[0].strip())
+
+
+def _has_column(session, table: str, column: str) -> bool:
+    return session.execute(
+        text("SELECT 1 FROM information_schema.columns "
+             "WHERE table_schema = current_schema() "
+             "AND table_name = :table AND column_name = :column"),
+        {"table": table, "column": column},
+    ).first() is not None
+
 
 def _create_views(session):
     #  view 1: average price by outward code
@@ -49,7 +201,40 @@ def _create_views(session):
     logger.info("View v_avg_price_outcode created / replaced")
 
 
-    # view 2: repeat‐sale flips within 24 months
-    flips_sql = import_sql_query(SQL_DIR / "v_flips_24m.sql")
+def _flips_view_for(table: str) -> str:
+    # emily_capstone → mv_flips_24m,
+    # emily_capstone_staging → mv_flips_24m_staging
+    return table.replace(TARGET_TABLE, FLIPS_VIEW)
+
+
+def _build_flips(session, table: str = TARGET_TABLE):
+    # repeat‐sale flips within 24 months, LEAD() over each property's sales
+    view = _flips_view_for(table)
+    flips_sql = import_sql_query(SQL_DIR / "mv_flips_24m.sql").format(
+        table=table, view=view
+    )
+    session.execute(text(f"DROP MATERIALIZED VIEW IF EXISTS {view};"))
     session.execute(text(flips_sql))
-    logger.info("View v_flips_24m created / replaced")
\ No newline at end of file
+    logger.info("Materialized view %s built", view)
+
+
+def _refresh_flips(session):
+    # the plain view it replaces
+    session.execute(text("DROP VIEW IF EXISTS v_flips_24m;"))
+    exists = session.execute(text(f"SELECT to_regclass('{FLIPS_VIEW}')"))
+    if exists.scalar() is None:
+        _build_flips(session)
+        return
+    session.execute(text(
+        f"REFRESH MATERIALIZED VIEW CONCURRENTLY {FLIPS_VIEW};"
+    ))
+    logger.info("Materialized view %s refreshed", FLIPS_VIEW)
+
+
+def _build_rollups(session):
+    # count / sum / min / max / sum of squares per month × borough × type ×
+    # estate × new-build, so the dashboards aggregate a few thousand cells
+    # instead of every sale
+    rollup_sql = import_sql_query(SQL_DIR / "price_rollup_monthly.sql")
+    session.execute(text(rollup_sql))
+    logger.info("Table price_rollup_monthly rebuilt")
@@ -0,0 +1,159 @@
+import os
+import json
+import shutil
+import logging
+import time
+import timeit
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pathlib import Path
+from sqlalchemy import text, inspect
+from sqlalchemy.types import (
+    BigInteger, Boolean, Date, DateTime, Integer, Numeric,
+)
+from etl.load.post_load_enrichment import FLIPS_VIEW
+from utils.logging_utils import setup_logger, log_load_success
+
+logger = setup_logger(__name__, "database_query.log", level=logging.INFO)
+
+TARGET_TABLE = "emily_capstone"
+
+# columnar copy of the target table, hive-partitioned by year and borough
+DEFAULT_SNAPSHOT_DIR = Path(__file__).parents[2] / ".cache" / "snapshot"
+
+# names the live snapshot directory under the snapshot root; replaced with a
+# single os.replace when a new snapshot is complete
+SNAPSHOT_CURRENT = "CURRENT"
+
+# written next to the partitions; pyarrow skips "_" files when scanning
+SNAPSHOT_META = "_snapshot.json"
+
+# the flips materialised view, exported as is: the Property Flips page reads
+# it instead of pairing up every sale of the snapshot
+SNAPSHOT_FLIPS = f"_{FLIPS_VIEW}.parquet"
+
+PARTITION_COLUMNS = ["year", "borough"]
+
+
+def export_snapshot(engine, version: int, path: Path = None,
+                    chunksize: int = None) -> int:
+    """
+    Stream TARGET_TABLE into a Parquet dataset partitioned by year/borough,
+    with the flips view beside it (SNAPSHOT_FLIPS), stamped with the dataset
+    version it was taken from. Each snapshot gets its own directory under
+    `path` and is published by replacing the SNAPSHOT_CURRENT pointer, so
+    readers see the old snapshot or the new one, never a gap between them.
+    :return: number of rows written
+    """
+    root = Path(path or os.getenv("SNAPSHOT_DIR", DEFAULT_SNAPSHOT_DIR))
+    previous = snapshot_path(root)
+    target = root / f"v{version}-{time.time_ns()}"
+    start_time = timeit.default_timer()
+
+    rows = 0
+    with engine.connect().execution_options(stream_results=True) as conn:
+        # every chunk gets the table's types, even where a chunk is all NULL
+        schema = _arrow_schema(conn, TARGET_TABLE).append(
+            pa.field("year", pa.int32())
+        )
+        chunks = pd.read_sql(
+            text(f"SELECT * FROM {TARGET_TABLE}"), conn,
+            chunksize=chunksize or int(
+                os.getenv("SNAPSHOT_CHUNKSIZE", "200000")
+            ),
+        )
+        for i, chunk in enumerate(chunks):
+            year = pd.to_datetime(chunk["date"]).dt.year.astype("int32")
+            table = pa.Table.from_pandas(
+                chunk.assign(year=year), schema=schema, preserve_index=False
+            )
+            ds.write_dataset(
+                table, target, format="parquet",
+                partitioning=PARTITION_COLUMNS, partitioning_flavor="hive",
+                basename_template=f"part-{i}-{{i}}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+            )
+            rows += len(chunk)
+
+        target.mkdir(parents=True, exist_ok=True)
+        flips = pd.read_sql(text(f"SELECT * FROM {FLIPS_VIEW}"), conn)
+        pq.write_table(
+            pa.Table.from_pandas(
+                flips, schema=_arrow_schema(conn, FLIPS_VIEW),
+                preserve_index=False,
+            ),
+            target / SNAPSHOT_FLIPS,
+        )
+
+    (target / SNAPSHOT_META).write_text(
+        json.dumps({"version": version, "rows": rows})
+    )
+
+    pointer = root / f"{SNAPSHOT_CURRENT}.tmp"
+    pointer.write_text(target.name)
+    os.replace(pointer, root / SNAPSHOT_CURRENT)
+
+    # the previous snapshot stays for readers still scanning it; anything
+    # older, or left by an export that failed, goes
+    for entry in root.iterdir():
+        if entry.name in (SNAPSHOT_CURRENT, target.name):
+            continue
+        if previous is not None and entry.name == previous.name:
+            continue
+        if entry.is_dir():
+            shutil.rmtree(entry, ignore_errors=True)
+        else:
+            entry.unlink(missing_ok=True)
+
+    log_load_success(
+        logger, "Parquet snapshot", rows, timeit.default_timer() - start_time
+    )
+    return rows
+
+
+def _arrow_type(sql_type) -> pa.DataType:
+    if isinstance(sql_type, BigInteger):
+        return pa.int64()
+    if isinstance(sql_type, Integer):
+        return pa.int32()
+    if isinstance(sql_type, Boolean):
+        return pa.bool_()
+    if isinstance(sql_type, DateTime):
+        return pa.timestamp("us")
+    if isinstance(sql_type, Date):
+        return pa.date32()
+    if isinstance(sql_type, Numeric):
+        return pa.float64()
+    return pa.string()
+
+
+def _arrow_schema(conn, relation: str) -> pa.Schema:
+    """Arrow schema of a table or materialised view, from its SQL types."""
+    columns = inspect(conn).get_columns(relation)
+    return pa.schema([(c["name"], _arrow_type(c["type"])) for c in columns])
+
+
+def snapshot_path(path: Path = None) -> Path:
+    """
+    Directory of the live snapshot under `path` (default SNAPSHOT_DIR),
+    None when no snapshot was published yet.
+    """
+    root = Path(path or os.getenv("SNAPSHOT_DIR", DEFAULT_SNAPSHOT_DIR))
+    try:
+        return root / (root / SNAPSHOT_CURRENT).read_text().strip()
+    except FileNotFoundError:
+        return None
+
+
+def snapshot_version(path: Path = None) -> int:
+    """Dataset version the snapshot was taken from, 0 when there is none."""
+    live = snapshot_path(path)
+    if live is None:
+        return 0
+    try:
+        meta = json.loads((live / SNAPSHOT_META).read_text())
+    except FileNotFoundError:
+        return 0
+    return meta["version"]
@@ -0,0 +1,44 @@
+CREATE MATERIALIZED VIEW {view} AS
+WITH sales AS (
+  SELECT
+    postcode,
+    address,
+    date                AS sale_date,
+    price               AS sale_price,
+    LEAD(date)  OVER w  AS next_date,
+    LEAD(price) OVER w  AS next_price
+  FROM {table}
+  WHERE address IS NOT NULL
+  WINDOW w AS (PARTITION BY postcode, address ORDER BY date, price)
+),
+paired AS (
+  SELECT
+    postcode,
+    address,
+    sale_date,
+    next_date,
+    sale_price,
+    next_price,
+    (((next_date - sale_date)::numeric) / 30.44)::INT AS months_between
+  FROM sales
+  WHERE next_date IS NOT NULL
+)
+SELECT DISTINCT
+  postcode,
+  address,
+  sale_date,
+  next_date,
+  sale_price,
+  next_price,
+  months_between,
+  ROUND((next_price - sale_price) * 100.0 / sale_price, 0)::INT AS pct_gain
+FROM paired
+WHERE months_between > 4
+  AND months_between <= 24
+  AND (next_price - sale_price) * 100.0 / sale_price BETWEEN 20 AND 1000;
+
+CREATE UNIQUE INDEX uq_{view}_sale
+  ON {view} (postcode, address, sale_date, sale_price, next_date, next_price);
+
+CREATE INDEX idx_{view}_pct_gain
+  ON {view} (pct_gain DESC);
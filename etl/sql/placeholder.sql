@@ -1,6 +1,6 @@
--- average price by outward-code (first 4 chars), last 5 years
+-- average price by outward code (the stored outcode column)
 SELECT
-    LEFT(postcode, 4)  AS outward_code,
+    outcode            AS outward_code,
     ROUND(AVG(price))  AS avg_price
 FROM   emily_capstone
 GROUP  BY outward_code
@@ -0,0 +1,23 @@
+DROP TABLE IF EXISTS price_rollup_monthly;
+
+CREATE TABLE price_rollup_monthly AS
+SELECT
+  (date_trunc('month', date))::date AS month,
+  borough,
+  property_type,
+  estate_type,
+  new_build,
+  COUNT(*)                          AS n_sales,
+  COUNT(price)                      AS n_priced,
+  SUM(price)::bigint                AS sum_price,
+  MIN(price)                        AS min_price,
+  MAX(price)                        AS max_price,
+  SUM(price::numeric * price)       AS sum_price_sq,
+  MIN(date)                         AS first_date
+FROM emily_capstone
+GROUP BY month, borough, property_type, estate_type, new_build;
+
+CREATE INDEX idx_price_rollup_monthly_borough
+  ON price_rollup_monthly (borough, month);
+
+ANALYZE price_rollup_monthly;
@@ -1,12 +1,25 @@
+import os
+import numpy as np
 import pandas as pd
 import logging
+import multiprocessing
+from pandas.util import hash_array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Tuple
 from utils.logging_utils import setup_logger
+from utils.metrics_utils import profile_stage
+from utils.date_utils import parse_dates
+from utils.text_utils import (
+    map_unique, map_unique_many, map_code, normalise_postcode, title_case,
+    outcode, postcode_sector, postcode_area,
+)
 
 # creates a module-level logger named after the module (etl.transform.transform_house_prices)
 logger = setup_logger(__name__, "transform_data.log")
 
 # a dictionary that maps raw column names to the cleaned ones
 KEEP_AND_RENAME = {
+    "unique_id":    "transaction_id",
     "price_paid":   "price",
     "deed_date":    "date",
     "postcode":     "postcode",
@@ -32,8 +45,48 @@ PROP_TYPE_MAP = {
 ESTATE_TYPE_MAP = {
     "L": "Leasehold", "F": "Freehold",
 }
+
+NEW_BUILD_MAP = {"Y": True, "N": False}
+
+# text columns normalised value by value (each distinct value once)
+TEXT_NORMALISERS = {
+    "postcode": normalise_postcode,
+    "borough":  title_case,
+    "street":   title_case,
+}
+
+# columns derived from the normalised postcode; stored, so queries group and
+# filter on indexed columns instead of splitting postcode per row
+POSTCODE_PARTS = {
+    "outcode":         outcode,
+    "postcode_sector": postcode_sector,
+    "postcode_area":   postcode_area,
+}
+
+# dtypes of the cleaned frame: low-cardinality text as category, day-precision
+# dates as datetime64 (pandas has no [D] unit, [s] is the smallest one);
+# load maps them back to SQL types
+OUTPUT_SCHEMA = {
+    "transaction_id":       "object",
+    "price":                "Int64",
+    "date":                 "datetime64[s]",
+    "postcode":             "object",
+    "property_type":        "category",
+    "new_build":            "boolean",
+    "estate_type":          "category",
+    "borough":              "category",
+    "transaction_category": "category",
+    "address":              "object",
+    "row_hash":             "int64",
+    "outcode":              "category",
+    "postcode_sector":      "category",
+    "postcode_area":        "category",
+}
 MANDATORY = ["price_paid", "deed_date", "postcode"]
 
+# 64-bit hash of the business key, computed by deduplicate; load upserts on it
+ROW_HASH = "row_hash"
+
 def remove_missing(df: pd.DataFrame) -> pd.DataFrame:
     return df.dropna(subset=MANDATORY)
 
@@ -52,66 +105,378 @@ def standardise_types(df: pd.DataFrame) -> pd.DataFrame:
     # convert price / date to numeric / date for analysis
     # errors="coerce" → non-convertible values (e.g. "—" or "N/A") become NaN instead of raising an exception.
     if "price" in df:
-        df["price"] = pd.to_numeric(df["price"], errors="coerce")
+        price = pd.to_numeric(df["price"], errors="coerce")
+        # whole pounds only: a fractional price would not cast to Int64
+        rejected = df["price"].notna() & (price.isna() | (price % 1 != 0))
+        if rejected.any():
+            logger.warning(
+                "Unparseable prices in %d rows (e.g. %s)", rejected.sum(),
+                ", ".join(map(repr, df.loc[rejected, "price"].unique()[:5])),
+            )
+        df["price"] = price.mask(rejected)
     if "date" in df:
-        df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.date
+        df["date"], failed = parse_dates(df["date"])
+        if len(failed):
+            logger.warning(
+                "Unparseable dates in %d rows (%d distinct, e.g. %s)",
+                failed.sum(), len(failed),
+                ", ".join(map(repr, failed.index[:5])),
+            )
+    if "transaction_id" in df:
+        # the bulk PPD files wrap the id in braces, the PPD app export does not
+        df["transaction_id"] = df["transaction_id"].str.strip("{}")
     return df
 
 
+def normalise_text(df: pd.DataFrame) -> pd.DataFrame:
+    """Apply TEXT_NORMALISERS to the columns present."""
+    for col, func in TEXT_NORMALISERS.items():
+        if col in df:
+            df[col] = map_unique(df[col], func)
+    return df
+
 def map_codes(df: pd.DataFrame) -> pd.DataFrame:
     if "property_type" in df:
-        df["property_type"] = df["property_type"].map(PROP_TYPE_MAP).fillna(df["property_type"])
+        df["property_type"] = map_unique(
+            df["property_type"], map_code(PROP_TYPE_MAP)
+        )
     if "estate_type" in df:
-        df["estate_type"]   = df["estate_type"].map(ESTATE_TYPE_MAP).fillna(df["estate_type"])
+        df["estate_type"] = map_unique(
+            df["estate_type"], map_code(ESTATE_TYPE_MAP)
+        )
     return df
 
 def remove_other_types(df: pd.DataFrame) -> pd.DataFrame:
     """Drop all rows where property_type == 'Other'."""
     return df[df["property_type"] != "Other"]
 
+ADDRESS_PARTS = ["saon", "paon", "street"]
+
+def _address_part(df: pd.DataFrame, col: str) -> pd.Series:
+    """Stripped text of one address column; "" where missing or blank."""
+    if col not in df:
+        return pd.Series("", index=df.index, dtype=object)
+    return map_unique(df[col], lambda part: str(part).strip()).fillna("")
+
 def build_address(df: pd.DataFrame) -> pd.DataFrame:
-    """Compose saon + paon + street then drop the parts."""
-    def make(row):
-        raw_parts = [row.get("saon"), row.get("paon"), row.get("street")]
-        parts = [str(p).strip() for p in raw_parts if pd.notna(p) and str(p).strip()]
-        if not parts:
-            return None
-        return ", ".join(parts[:-1]) + (" " if len(parts) > 1 else "") + parts[-1]
+    """
+    Compose saon + paon + street then drop the parts.
+    Present parts are joined as "saon, paon street": the separator after a
+    part is ", " unless the next present part is the last one, then " ".
+    """
+    saon, paon, street = (_address_part(df, c) for c in ADDRESS_PARTS)
+    has_saon, has_paon, has_street = saon.ne(""), paon.ne(""), street.ne("")
 
-    df["address"] = df.apply(make, axis=1)
-    return df.drop(columns=["saon", "paon", "street"], errors="ignore")
+    after_saon = np.select(
+        [has_saon & has_paon & has_street, has_saon & (has_paon | has_street)],
+        [", ", " "],
+        "",
+    )
+    after_paon = np.where(has_paon & has_street, " ", "")
+
+    address = saon + after_saon + paon + after_paon + street
+    df["address"] = address.where(has_saon | has_paon | has_street, None)
+    return df.drop(columns=ADDRESS_PARTS, errors="ignore")
 
 
 def remove_invalid_dates(df: pd.DataFrame) -> pd.DataFrame:
     """Drop rows where date could not be parsed (NaT)."""
     return df.dropna(subset=["date"])
 
-def deduplicate(df: pd.DataFrame) -> pd.DataFrame:
-    before = len(df)
-    df = df.drop_duplicates()
-    # logger.info("Removed %d duplicate rows", before - len(df))
+def _hash_column(values: pd.Series) -> np.ndarray:
+    """
+    uint64 hash of every value: dates as datetime64[ns], numbers as float64,
+    anything else as whitespace-collapsed upper-case text. Text is factorized
+    first so each distinct value is normalised and hashed once.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        nanoseconds = values.astype("datetime64[ns]").to_numpy().view("int64")
+        return hash_array(nanoseconds)
+    if (pd.api.types.is_numeric_dtype(values)
+            and not pd.api.types.is_bool_dtype(values)):
+        return hash_array(values.astype("float64").to_numpy())
+    codes, uniques = pd.factorize(values.astype(object))
+    normalised = [" ".join(str(u).split()).upper() for u in uniques]
+    # code -1 (missing) picks the trailing None
+    return hash_array(np.array(normalised + [None], dtype=object))[codes]
+
+def row_hash(df: pd.DataFrame, key: List[str] = None) -> pd.Series:
+    """
+    64-bit hash of the key columns of every row, so rows that differ only in
+    dtype, spacing or case hash the same. The key defaults to DEDUP_KEY
+    (e.g. DEDUP_KEY=price,date,postcode,address), else every column but
+    transaction_id in name order, so the source's column order doesn't
+    matter. Returned as int64 so it can be stored in BIGINT.
+    """
+    if key is None:
+        setting = os.getenv("DEDUP_KEY", "")
+        key = [c.strip() for c in setting.split(",") if c.strip()]
+    key = key or sorted(df.columns.drop("transaction_id", errors="ignore"))
+    hashes = np.zeros(len(df), dtype=np.uint64)
+    for col in key:
+        hashes = hashes * np.uint64(0x100000001B3) ^ _hash_column(df[col])
+    return pd.Series(hashes.view(np.int64), index=df.index, name=ROW_HASH)
+
+def _not_in(values: pd.Series, seen: set) -> np.ndarray:
+    # a set lookup per value: Series.isin would rebuild a table of all of seen
+    return np.fromiter(
+        (v not in seen for v in values), dtype=bool, count=len(values)
+    )
+
+def first_rows(hashes: pd.Series, ids: pd.Series = None,
+               seen: Tuple[set, set] = None) -> np.ndarray:
+    """
+    The keep rule of every dedup path: the first row of every ROW_HASH (the
+    same sale, however often it was registered), then of those the first
+    row of every transaction_id (rows without one are all kept). `seen`
+    carries the (hashes, ids) of rows kept from earlier chunks of a stream:
+    rows matching them are dropped, and the keys kept here are added.
+    :return: boolean mask of the rows to keep
+    """
+    keep = ~hashes.duplicated().to_numpy()
+    if seen is not None:
+        keep &= _not_in(hashes, seen[0])
+    if ids is not None:
+        kept = ids[keep]
+        first = (kept.isna() | ~kept.duplicated()).to_numpy()
+        if seen is not None:
+            first &= _not_in(kept, seen[1])
+        keep[keep] = first
+    if seen is not None:
+        seen[0].update(hashes[keep])
+        if ids is not None:
+            seen[1].update(ids[keep].dropna())
+    return keep
+
+def deduplicate(df: pd.DataFrame,
+                seen: Tuple[set, set] = None) -> pd.DataFrame:
+    """
+    Keep the first_rows of df. ROW_HASH stays on the frame as the key load
+    upserts on.
+    """
+    hashes = row_hash(df)
+    rows = np.flatnonzero(first_rows(hashes, df.get("transaction_id"), seen))
+    df = df.take(rows)
+    df[ROW_HASH] = hashes.to_numpy()[rows]
     return df
 
 def remove_non_standard_transaction(df: pd.DataFrame) -> pd.DataFrame:
      return df[df["transaction_category"] != "B"]
 
-def clean_house_prices(df_raw: pd.DataFrame) -> pd.DataFrame:
+def add_postcode_parts(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add the POSTCODE_PARTS columns. Runs after deduplicate: they follow from
+    postcode, so they are kept out of ROW_HASH.
+    """
+    if "postcode" not in df:
+        return df
+    return df.assign(**map_unique_many(df["postcode"], POSTCODE_PARTS))
+
+def apply_output_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast the cleaned columns to OUTPUT_SCHEMA (absent ones are skipped)."""
+    if "new_build" in df:
+        df["new_build"] = df["new_build"].map(NEW_BUILD_MAP)
+    return df.astype({
+        col: dtype for col, dtype in OUTPUT_SCHEMA.items() if col in df
+    })
+
+# the cleaning chain, in order; profile_stage times and counts every stage
+CLEAN_STAGES = [
+    remove_missing,
+    select_and_rename,
+    standardise_types,
+    normalise_text,
+    map_codes,
+    remove_other_types,
+    build_address,
+    remove_invalid_dates,
+    deduplicate,
+    remove_non_standard_transaction,
+    add_postcode_parts,
+    apply_output_schema,
+]
+
+def clean_house_prices(df_raw: pd.DataFrame,
+                       metrics: List[dict] = None) -> pd.DataFrame:
+    """
+    Run df_raw through CLEAN_STAGES, appending one record per stage to
+    metrics.
+    """
     logger.info("▶︎ Cleaning house-price data …")
 
-    df = (
-        df_raw
-        .pipe(remove_missing)
-        .pipe(select_and_rename)
-        .pipe(standardise_types)
-        .pipe(map_codes)
-        .pipe(remove_other_types)
-        .pipe(build_address)
-        .pipe(remove_invalid_dates)
-        .pipe(deduplicate)
-        .pipe(remove_non_standard_transaction)
-    )
+    df = df_raw
+    for stage in CLEAN_STAGES:
+        df = df.pipe(profile_stage(stage, metrics))
 
     logger.info("✓ Clean complete - final shape %s", df.shape)
     print("Columns after cleaning:", df.columns.tolist())
 
-    return df
\ No newline at end of file
+    return df
+
+
+# the parallel driver's shard keys
+SHARD_BY = ("rows", "borough")
+
+# every stage before deduplicate is row-local and runs per shard; the rest
+# needs the whole frame and runs on the merged shards
+SHARD_STAGES = CLEAN_STAGES[:CLEAN_STAGES.index(deduplicate)]
+MERGE_STAGES = CLEAN_STAGES[CLEAN_STAGES.index(deduplicate) + 1:]
+
+# the frame being sharded; forked workers inherit it instead of unpickling
+# a copy
+_shard_source = None
+
+def _with_dedup_hashes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Append ROW_HASH and a hash of transaction_id, so the merged shards can
+    be deduplicated without re-reading the wide text columns.
+    """
+    hashes = {ROW_HASH: row_hash(df)}
+    if "transaction_id" in df:
+        hashes["_id_hash"] = pd.util.hash_pandas_object(
+            df["transaction_id"], index=False
+        )
+    return df.assign(**hashes)
+
+def _clean_shard(rows) -> Tuple[pd.DataFrame, List[dict]]:
+    """
+    Worker: SHARD_STAGES over some rows of _shard_source (or a shipped
+    frame).
+    """
+    df = _shard_source.iloc[rows] if _shard_source is not None else rows
+    metrics = []
+    for stage in SHARD_STAGES:
+        df = df.pipe(profile_stage(stage, metrics))
+    return _with_dedup_hashes(df), metrics
+
+def deduplicate_shards(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    deduplicate over the merged shards, comparing the hashes the workers
+    appended.
+    """
+    ids = None
+    if "_id_hash" in df:
+        ids = pd.Series(df["_id_hash"].to_numpy(), dtype="UInt64").mask(
+            df["transaction_id"].isna().to_numpy()
+        )
+    keep = first_rows(df[ROW_HASH], ids)
+    columns = [i for i, c in enumerate(df.columns) if c != "_id_hash"]
+    return df.iloc[np.flatnonzero(keep), columns]
+
+def clean_house_prices_parallel(df_raw: pd.DataFrame,
+                                metrics: List[dict] = None,
+                                max_workers: int = None,
+                                shard_by: str = "rows",
+                                min_rows: int = None) -> pd.DataFrame:
+    """
+    clean_house_prices on a process pool: the raw frame is split into one
+    shard per worker (equal row ranges, or one per borough), SHARD_STAGES
+    run per shard, and the shards are merged in their original order before
+    deduplicate and the MERGE_STAGES, so the result equals the in-process one.
+    Small frames (< min_rows, default TRANSFORM_PARALLEL_MIN_ROWS) or a
+    single worker (max_workers, default TRANSFORM_WORKERS or one per CPU
+    core) run in-process.
+    """
+    global _shard_source
+    workers = max_workers or int(
+        os.getenv("TRANSFORM_WORKERS", os.cpu_count() or 1)
+    )
+    if min_rows is None:
+        min_rows = int(os.getenv("TRANSFORM_PARALLEL_MIN_ROWS", "200000"))
+    if workers < 2 or len(df_raw) < min_rows:
+        return clean_house_prices(df_raw, metrics)
+    if shard_by not in SHARD_BY:
+        raise ValueError(f"Unknown shard key: {shard_by}")
+    logger.info(
+        "▶︎ Cleaning house-price data on %d processes by %s …",
+        workers, shard_by,
+    )
+
+    labels = df_raw.index
+    df = df_raw.reset_index(drop=True)
+    if shard_by == "borough":
+        shards = list(df.groupby("borough", sort=False).indices.values())
+    else:
+        shards = np.array_split(np.arange(len(df)), workers)
+
+    fork = "fork" in multiprocessing.get_all_start_methods()
+    _shard_source = df if fork else None
+    try:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(shards)),
+            mp_context=multiprocessing.get_context("fork") if fork else None,
+        ) as pool:
+            jobs = shards if fork else [df.iloc[rows] for rows in shards]
+            results = list(pool.map(_clean_shard, jobs))
+    finally:
+        _shard_source = None
+
+    if metrics is not None:
+        for _, shard_metrics in results:
+            metrics.extend(shard_metrics)
+    merged = pd.concat([shard for shard, _ in results])
+    if shard_by == "borough":
+        merged = merged.sort_index()
+
+    merged = merged.pipe(profile_stage(deduplicate_shards, metrics))
+    for stage in MERGE_STAGES:
+        merged = merged.pipe(profile_stage(stage, metrics))
+    merged.index = labels[merged.index]
+
+    logger.info("✓ Clean complete - final shape %s", merged.shape)
+    logger.info("Columns after cleaning: %s", merged.columns.tolist())
+    return merged
+
+
+def clean_house_price_chunks(
+    chunks: Iterable[pd.DataFrame], metrics: List[dict] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Clean a stream of raw chunks one at a time: the CLEAN_STAGES of each
+    chunk, with deduplicate also dropping the rows whose ROW_HASH or
+    transaction_id an earlier chunk kept (the first_rows rule, carried across
+    chunks), so the stream keeps the rows a single frame would and only the
+    keys outlive a chunk.
+    """
+    seen = (set(), set())
+
+    def deduplicate_stream(df: pd.DataFrame) -> pd.DataFrame:
+        return deduplicate(df, seen)
+
+    rows = 0
+    for chunk in chunks:
+        df = chunk
+        for stage in SHARD_STAGES + [deduplicate_stream] + MERGE_STAGES:
+            df = df.pipe(profile_stage(stage, metrics))
+        if len(df):
+            rows += len(df)
+            yield df
+    logger.info("✓ Streamed clean complete - %d unique rows", rows)
+
+
+def clean_house_price_deltas(
+    df_raw: pd.DataFrame, metrics: List[dict] = None,
+) -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    Split a PPD update file on record_status and clean the A/C rows.
+    :return: (rows to upsert, transaction ids to delete). Deleted ids are the
+    D rows plus any A/C row that no longer passes cleaning, so a change
+    that turns a sale into e.g. category B removes it from the table.
+    """
+    status = df_raw["record_status"].str.strip().str.upper()
+    ids = df_raw["unique_id"].str.strip("{}")
+
+    upserts = clean_house_prices(
+        df_raw[status.isin(["A", "C"])].drop(columns="record_status"), metrics
+    )
+    # a delete wins over an add/change of the same id in the same file
+    upserts = upserts[~upserts["transaction_id"].isin(ids[status == "D"])]
+    cleaned_out = ~ids.isin(upserts["transaction_id"])
+    dropped = ids[status.isin(["A", "C"]) & cleaned_out]
+    deletes = pd.concat([ids[status == "D"], dropped]).drop_duplicates()
+
+    logger.info(
+        "✓ Delta clean complete - %d upserts, %d deletes",
+        len(upserts), len(deletes),
+    )
+    return upserts, deletes
@@ -1,5 +1,21 @@
 import pandas as pd
-from etl.transform.clean_house_prices import clean_house_prices
+from typing import Iterable, Iterator, List, Tuple
+from etl.transform.clean_house_prices import (
+    clean_house_prices_parallel,
+    clean_house_price_chunks,
+    clean_house_price_deltas,
+)
 
-def transform_data(df: pd.DataFrame) -> pd.DataFrame:
-    return clean_house_prices(df)
\ No newline at end of file
+def transform_data(df: pd.DataFrame,
+                   metrics: List[dict] = None) -> pd.DataFrame:
+    return clean_house_prices_parallel(df, metrics)
+
+def transform_data_chunks(
+    chunks: Iterable[pd.DataFrame], metrics: List[dict] = None,
+) -> Iterator[pd.DataFrame]:
+    return clean_house_price_chunks(chunks, metrics)
+
+def transform_data_deltas(
+    df: pd.DataFrame, metrics: List[dict] = None,
+) -> Tuple[pd.DataFrame, pd.Series]:
+    return clean_house_price_deltas(df, metrics)
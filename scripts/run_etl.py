@@ -1,35 +1,291 @@
 import os
 import sys
+import argparse
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from etl.config.env_config import setup_env
-from etl.extract.extract import extract_data
-from etl.transform.transform import transform_data
-from etl.load.load import load_data
+from etl.config.env_config import setup_env, ENVS
+from etl.config.db_config import load_db_config
+from etl.extract.extract import extract_data, extract_monthly_data
+from etl.extract.extract_house_prices import raw_file_fingerprints
+from utils.file_utils import file_fingerprint
+from etl.transform.transform import (
+    transform_data,
+    transform_data_chunks,
+    transform_data_deltas,
+)
+from etl.load.load import (
+    load_data,
+    load_data_chunks,
+    upsert_data,
+    apply_deltas,
+    load_year,
+    enrich_loaded_table,
+)
+from etl.load.checkpoint import (
+    STAGES,
+    open_checkpoint,
+    mark_done,
+    load_frame,
+    resume_stage,
+)
+from etl.load.snapshot import export_snapshot
+from etl.load.etl_state import (
+    load_etl_state,
+    save_etl_state,
+    update_watermarks,
+    changed_boroughs,
+    MONTHLY_UPDATE,
+    load_dataset_version,
+)
+from streamlit_app.data_access import warm_cache
+from utils.db_utils import get_db_engine
+from utils.metrics_utils import write_run_metrics
 
 
 def main():
-    run_env_setup()
+    args = parse_args()
+    run_env_setup(args.env)
 
-    print("Extracting data...")
-    extracted_data = extract_data()
-    print("Data extraction complete.")
+    # per-stage timings / memory / row counts of the clean chain for this run
+    metrics = []
+    if args.monthly_update:
+        mode = "monthly"
+        run_monthly_update(args.monthly_update, metrics)
+    elif args.year:
+        mode = "year"
+        run_year(args.year, metrics)
+    elif args.incremental:
+        mode = "incremental"
+        run_incremental(metrics)
+    elif args.chunksize:
+        mode = "streaming"
+        run_streaming(args.chunksize, metrics)
+    else:
+        mode = "full"
+        run_full(metrics, args.from_stage, args.resume, args.checkpoint)
+    if metrics:
+        print(f"Stage metrics written to {write_run_metrics(metrics, mode)}")
 
-    # transform
-    print("Transforming …")
-    tidy_df = transform_data(extracted_data)
-
-    # load
-    print("Loading …")
-    load_data(tidy_df)
+    if args.snapshot:
+        run_snapshot()
+    if args.warm_cache:
+        run_cache_warming()
 
     # finishing
     print(
         f"ETL pipeline run successfully in "
         f'{os.getenv("ENV", "error")} environment!'
     )
-def run_env_setup():
+
+
+def run_full(metrics=None, from_stage=None, resume=False, checkpoint=False):
+    # with checkpoints every stage is recorded, so a failed run can restart at
+    # the stage that failed; restarted runs keep checkpointing in case they
+    # fail again
+    fingerprints = raw_file_fingerprints()
+    if checkpoint or resume or from_stage:
+        checkpoint = open_checkpoint(fingerprints)
+    else:
+        checkpoint = None
+    if resume:
+        from_stage = resume_stage(checkpoint)
+        if from_stage is None:
+            print(
+                "The last run over these source files completed, "
+                "nothing to resume."
+            )
+            return
+    start = STAGES.index(from_stage or STAGES[0])
+    if start:
+        print(f"Resuming at the {STAGES[start]} stage …")
+
+    if start <= STAGES.index("extract"):
+        print("Extracting data...")
+        extracted_data = extract_data()
+        if checkpoint:
+            mark_done(checkpoint, "extract", extracted_data)
+        print("Data extraction complete.")
+
+    # transform
+    if start <= STAGES.index("transform"):
+        if start == STAGES.index("transform"):
+            extracted_data = load_frame(checkpoint, "extract")
+        print("Transforming …")
+        tidy_df = transform_data(extracted_data, metrics)
+        if checkpoint:
+            mark_done(checkpoint, "transform", tidy_df)
+    elif start == STAGES.index("load"):
+        tidy_df = load_frame(checkpoint, "transform")
+
+    # load
+    if start <= STAGES.index("load"):
+        print("Loading …")
+        load_data(tidy_df, enrich=False)
+
+        watermarks = {}
+        update_watermarks(watermarks, tidy_df)
+        record_state(watermarks, fingerprints)
+        if checkpoint:
+            mark_done(checkpoint, "load")
+
+    print("Enriching …")
+    enrich_loaded_table()
+    if checkpoint:
+        mark_done(checkpoint, "enrich")
+
+
+def run_streaming(chunksize, metrics=None):
+    # extract → transform → load one chunk at a time, memory stays flat
+    print(f"Streaming extract/transform/load in chunks of {chunksize} rows …")
+    fingerprints = raw_file_fingerprints()
+    watermarks = {}
+
+    def tracked(chunks):
+        for chunk in chunks:
+            update_watermarks(watermarks, chunk)
+            yield chunk
+
+    chunks = extract_data(chunksize=chunksize)
+    load_data_chunks(tracked(transform_data_chunks(chunks, metrics)))
+    record_state(watermarks, fingerprints)
+
+
+def run_incremental(metrics=None):
+    # only re-read the borough files that changed; every row of those is
+    # upserted, so late registrations with old deed dates are not lost
+    state = load_etl_state(target_engine())
+    if not state:
+        print("No ETL state recorded yet, running a full load …")
+        return run_full(metrics)
+
+    fingerprints = raw_file_fingerprints()
+    changed = changed_boroughs(state, fingerprints)
+    if not changed:
+        print("Source files unchanged since the last run, nothing to load.")
+        return
+
+    print(f"Incremental load for: {', '.join(changed)}")
+    extracted_data = extract_data(boroughs=changed)
+    tidy_df = transform_data(extracted_data, metrics)
+    if not tidy_df.empty:
+        upsert_data(tidy_df)
+
+    watermarks = {}
+    update_watermarks(watermarks, tidy_df)
+    record_state(watermarks, {b: fingerprints[b] for b in changed})
+
+
+def run_monthly_update(path, metrics=None):
+    # apply a Land Registry monthly A/C/D file instead of reloading the full
+    # history
+    print(f"Applying PPD monthly update {path} …")
+    extracted_data = extract_monthly_data(path)
+    upserts, deletes = transform_data_deltas(extracted_data, metrics)
+    apply_deltas(upserts, deletes)
+
+    # one watermark for the monthly files, the borough rows track their own
+    # files
+    watermarks = {}
+    update_watermarks(watermarks, upserts.assign(borough=MONTHLY_UPDATE))
+    record_state(watermarks, {MONTHLY_UPDATE: file_fingerprint(path)})
+
+
+def run_snapshot():
+    # columnar copy of the table the dashboard can read instead of Postgres
+    engine = target_engine()
+    print("Writing the Parquet snapshot …")
+    rows = export_snapshot(engine, load_dataset_version(engine))
+    print(f"Snapshot written: {rows} rows.")
+
+
+def run_cache_warming():
+    # pre-run the dashboard queries so the first page view after a load is warm
+    engine = target_engine()
+    print("Warming the dashboard cache …")
+    n = warm_cache(engine, load_dataset_version(engine))
+    print(f"Cached {n} dashboard queries.")
+
+
+def run_year(year, metrics=None):
+    # rebuild one year's partition from the source files, leave the rest alone
+    print(f"Reloading {year} …")
+    tidy_df = transform_data(extract_data(), metrics)
+    load_year(tidy_df, year)
+
+
+def record_state(watermarks, fingerprints):
+    save_etl_state(target_engine(), {
+        borough: {
+            "max_date": watermarks.get(borough), "source_fingerprint": fp,
+        }
+        for borough, fp in fingerprints.items()
+    })
+
+
+def target_engine():
+    return get_db_engine(load_db_config()["target_database"])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the house-price ETL")
+    parser.add_argument("env", choices=ENVS, help="environment to run in")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--chunksize", type=int, default=None,
+        help="stream the pipeline in chunks of this many rows"
+    )
+    mode.add_argument(
+        "--incremental", action="store_true",
+        help="only load new rows from borough files that changed since the "
+             "last run"
+    )
+    mode.add_argument(
+        "--monthly-update", metavar="PATH", default=None,
+        help="apply a PPD monthly update file (A/C/D record status) to the "
+             "table"
+    )
+    mode.add_argument(
+        "--year", type=int, default=None,
+        help="reload only this year's partition from the source files"
+    )
+    restart = parser.add_mutually_exclusive_group()
+    restart.add_argument(
+        "--checkpoint", action="store_true",
+        help="full run only: keep the output of every stage so a failed run "
+             "can be restarted"
+    )
+    restart.add_argument(
+        "--resume", action="store_true",
+        help="full run only: restart at the first stage the last run over "
+             "the same source files did not finish"
+    )
+    restart.add_argument(
+        "--from-stage", choices=STAGES, default=None,
+        help="full run only: start at this stage, reading the previous "
+             "stage's checkpoint"
+    )
+    parser.add_argument(
+        "--snapshot", action="store_true",
+        help="afterwards, write the table to a Parquet snapshot partitioned "
+             "by year/borough"
+    )
+    parser.add_argument(
+        "--warm-cache", action="store_true",
+        help="afterwards, pre-run the dashboard queries into the shared "
+             "on-disk cache"
+    )
+    args = parser.parse_args(argv)
+    if (args.checkpoint or args.resume or args.from_stage) and (
+        args.chunksize or args.incremental or args.monthly_update or args.year
+    ):
+        parser.error(
+            "--checkpoint / --resume / --from-stage only apply to a full run"
+        )
+    return args
+
+
+def run_env_setup(env):
     print("Setting up environment...")
-    setup_env(sys.argv)
+    setup_env([sys.argv[0], env])
     print("Environment setup complete.")
 
 
@@ -0,0 +1,44 @@
+"""
+Regenerate the "Data cleaning" row counts in README.md from a stage
+metrics file written by run_etl.py (the latest one by default).
+
+    python scripts/update_readme_counts.py [logs/metrics/full-....json]
+"""
+import os
+import re
+import sys
+import json
+import argparse
+from pathlib import Path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.metrics_utils import latest_metrics, render_cleaning_counts
+
+README = Path(__file__).resolve().parent.parent / "README.md"
+START, END = "<!-- cleaning-counts:start -->", "<!-- cleaning-counts:end -->"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("metrics", nargs="?", default=None,
+                        help="metrics JSON file, defaults to the latest one")
+    args = parser.parse_args()
+
+    path = Path(args.metrics) if args.metrics else latest_metrics()
+    if path is None:
+        sys.exit("No stage metrics found, run scripts/run_etl.py first.")
+
+    counts = render_cleaning_counts(json.loads(path.read_text())["stages"])
+    readme = README.read_text()
+    updated, n = re.subn(
+        f"{re.escape(START)}.*?{re.escape(END)}",
+        lambda _: f"{START}\n{counts}\n{END}",
+        readme, flags=re.S,
+    )
+    if not n:
+        sys.exit(f"{README} has no {START} … {END} section.")
+    README.write_text(updated)
+    print(f"README row counts updated from {path}")
+
+
+if __name__ == "__main__":
+    main()
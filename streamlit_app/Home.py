@@ -1,8 +1,8 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
-from sqlalchemy import text
-from streamlit_app.config import engine
+from streamlit_app.config import engine, dataset_version, CACHED_VERSIONS
+from streamlit_app.data_access import read_query
 from datetime import datetime
 
 st.set_page_config(
@@ -26,17 +26,11 @@ st.markdown(
     """
 )
 
-@st.cache_data(ttl=3600)
-def load_home_metrics():
-    sql = text("""
-        SELECT
-          COUNT(*)             AS total_sales,
-          ROUND(AVG(price))    AS avg_price,
-          MIN(date)           AS date_from
-        FROM clean_house_prices;
-    """)
-    return pd.read_sql(sql, engine).iloc[0]
-metrics = load_home_metrics()
+@st.cache_data(max_entries=CACHED_VERSIONS)
+def load_home_metrics(version: int):
+    return read_query("home_metrics", engine, version).iloc[0]
+version = dataset_version()
+metrics = load_home_metrics(version)
 col1, col2, col3, col4 = st.columns(4)
 col1.metric("Total sales number",     f"{metrics.total_sales:,}")
 col2.metric("Avg. sale price","£" + f"{metrics.avg_price:,}")
@@ -46,22 +40,17 @@ col4.metric("End Date", end_date.strftime("%Y-%m-%d"))
 
 st.markdown("### 📈 5-Year Price Trend ")
 
-@st.cache_data(ttl=3600)
-def load_raw_price_data() -> pd.DataFrame:
-    sql = text("""
-        SELECT date, borough, property_type, new_build, price
-        FROM clean_house_prices
-    """)
-    df = pd.read_sql(sql, engine)
-    df["year"] = pd.DatetimeIndex(df["date"]).year
-    return df
+@st.cache_data(max_entries=CACHED_VERSIONS)
+def load_price_rollup(version: int) -> pd.DataFrame:
+    """Sales count and price sum per year, borough and property type."""
+    return read_query("price_rollup", engine, version)
 
 
 def render():
     # overview
 
 
-    df = load_raw_price_data()
+    df = load_price_rollup(version)
 
     # 1) Property-type dropdown
     all_types = sorted(df["property_type"].unique())
@@ -80,16 +69,20 @@ def render():
         df_sel = df_sel[df_sel["property_type"] == type_choice]
 
 
-    # 3) Aggregate by year & borough
+    # 3) Aggregate by year & borough (the mean is re-derived from the
+    #    rolled-up sums)
     df_trend = (
         df_sel
         .groupby(["year", "borough"], as_index=False)
         .agg(
-            avg_price=("price", "mean"),
-            n_sales=("price", "count")
+            sum_price=("sum_price", "sum"),
+            n_priced=("n_priced", "sum"),
+            n_sales=("n_sales", "sum")
         )
     )
-    df_trend["avg_price"] = df_trend["avg_price"].round()
+    df_trend["avg_price"] = (
+        df_trend["sum_price"] / df_trend["n_priced"]
+    ).round()
 
     # 4) Plot
     order = ['Westminster', 'Wandsworth', 'Brent', 'Hackney', 'Greenwich']
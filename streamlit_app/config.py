@@ -1,13 +1,40 @@
 import os
+import streamlit as st
 from dotenv import load_dotenv
 from etl.config.db_config import load_db_config
-from utils.db_utils import create_db_engine
+from utils.db_utils import get_db_engine
+from streamlit_app.data_access import current_version
 
 # Load local environment for dev; in production use Streamlit secrets
 load_dotenv(".env.dev", override=False)
 
+# dataset versions whose results every cached loader keeps: the live one and
+# the one before it; older versions are evicted instead of piling up until
+# restart
+CACHED_VERSIONS = 2
+
+# per-borough loaders keep CACHED_VERSIONS entries for each London borough
+BOROUGH_CACHE_ENTRIES = CACHED_VERSIONS * 33
+
+
+@st.cache_resource(show_spinner=False)
+def get_engine():
+    # one pooled engine shared by every page and every session
+    return get_db_engine(load_db_config()["target_database"])
+
+
 # Build and expose a single SQLAlchemy engine for all pages
-engine = create_db_engine(load_db_config()["target_database"])
+engine = get_engine()
+
+
+def dataset_version() -> int:
+    """
+    Version of the last finished ETL load (one primary-key lookup, or the
+    snapshot's stamp with the snapshot backend).
+    Cached loaders take it as an argument, so their results stay hot until
+    the next load and are recomputed right after it.
+    """
+    return current_version(engine)
 
 # # below is for deployment
 # import os
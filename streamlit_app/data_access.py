@@ -1,9 +1,383 @@
+import os
+import re
+import json
+import hashlib
+import logging
+from datetime import date
 import pandas as pd
-from sqlalchemy import text
-from utils.sql_utils import import_sql_query
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 from pathlib import Path
-from .config import engine
+from sqlalchemy import text
+from etl.load.etl_state import load_dataset_version
+from etl.load.snapshot import SNAPSHOT_FLIPS, snapshot_path, snapshot_version
+from utils.logging_utils import setup_logger
+
+logger = setup_logger(__name__, "dashboard_cache.log", level=logging.INFO)
+
+# query results as Arrow files, reused by every Streamlit process on the host
+# (a query runs once per host, not once per process) and persisted across
+# restarts; pre-filled by run_etl --warm-cache. Each process still reads the
+# rows it serves into its own memory. DASHBOARD_CACHE_DIR overrides it.
+DEFAULT_CACHE_DIR = Path(__file__).parents[1] / ".cache" / "dashboard"
+
+# rows shown on the Property Flips page
+TOP_FLIPS = 5000
+
+# years of monthly volumes on the Stamp Duty page
+VOLUME_YEARS = 5
+
+# every query the dashboard pages run; averages divide the price_rollup_monthly
+# sums by n_priced (sales with a price), n_sales counts every sale, and the
+# first date comes from the rollup instead of a scan of the whole table
+DASHBOARD_QUERIES = {
+    "home_metrics": """
+        SELECT
+          SUM(n_sales)::bigint                  AS total_sales,
+          ROUND(SUM(sum_price) / NULLIF(SUM(n_priced), 0)) AS avg_price,
+          MIN(first_date)                       AS date_from
+        FROM price_rollup_monthly;
+    """,
+    "price_rollup": """
+        SELECT
+          EXTRACT(YEAR FROM month)::int AS year,
+          borough,
+          property_type,
+          SUM(n_sales)::bigint          AS n_sales,
+          SUM(n_priced)::bigint         AS n_priced,
+          SUM(sum_price)::bigint        AS sum_price
+        FROM price_rollup_monthly
+        GROUP BY year, borough, property_type
+    """,
+    "borough_list": """
+        SELECT DISTINCT borough FROM price_rollup_monthly ORDER BY borough
+    """,
+    "borough_rollup": """
+        SELECT
+          EXTRACT(YEAR FROM month)::int AS year,
+          property_type,
+          estate_type,
+          SUM(n_sales)::bigint          AS n_sales,
+          SUM(n_priced)::bigint         AS n_priced,
+          SUM(sum_price)::bigint        AS sum_price
+        FROM price_rollup_monthly
+        WHERE borough = :borough_choice
+        GROUP BY year, property_type, estate_type
+    """,
+    "outcode_heatmap": """
+        SELECT outcode, avg_price, n_sales
+        FROM v_avg_price_outcode
+        ORDER BY avg_price DESC;
+    """,
+    "top_flips": """
+        SELECT
+          postcode,
+          address,
+          sale_date,
+          next_date,
+          sale_price,
+          next_price,
+          months_between,
+          pct_gain
+        FROM mv_flips_24m
+        ORDER BY pct_gain DESC
+        LIMIT :n;
+    """,
+    "monthly_volumes": """
+        SELECT
+          (date_trunc('month', date))::date AS month,
+          borough,
+          COUNT(*)                        AS n_sales
+        FROM emily_capstone
+        WHERE date >= :since
+        GROUP BY month, borough
+        ORDER BY month, borough;
+    """,
+    "postcode_count": """
+        SELECT COUNT(*) AS n_found
+        FROM emily_capstone
+        WHERE postcode LIKE :pattern;
+    """,
+    "postcode_search": """
+        SELECT
+          date, postcode, price, property_type, address
+        FROM emily_capstone
+        WHERE postcode LIKE :pattern
+        ORDER BY date DESC, postcode, address
+        LIMIT :limit OFFSET :offset;
+    """,
+}
+
+
+def current_version(engine) -> int:
+    """
+    Version of the data the dashboard serves. DASHBOARD_BACKEND=snapshot
+    answers every page query from the Parquet snapshot written by
+    run_etl --snapshot instead of Postgres.
+    """
+    if os.getenv("DASHBOARD_BACKEND", "postgres") == "snapshot":
+        return snapshot_version()
+    return load_dataset_version(engine)
+
+
+def read_query(name: str, engine, version: int, **params) -> pd.DataFrame:
+    """
+    Result of DASHBOARD_QUERIES[name] for this dataset version, read from
+    the on-disk cache when any process already ran the same SQL + params.
+    """
+    sql = DASHBOARD_QUERIES[name]
+    path = _cache_path(name, sql, version, params)
+    try:
+        return _read_cache(path)
+    except (FileNotFoundError, pa.ArrowException):
+        if os.getenv("DASHBOARD_BACKEND", "postgres") == "snapshot":
+            live = snapshot_path()
+            if live is None:
+                raise FileNotFoundError(
+                    "No Parquet snapshot: run run_etl --snapshot"
+                )
+            df = SNAPSHOT_QUERIES[name](live, **params)
+        else:
+            df = pd.read_sql(text(sql), engine, params=params or None)
+        _write_cache(df, path)
+        return df
+
+
+def warm_cache(engine, version: int) -> int:
+    """
+    Run every dashboard query for `version` into the on-disk cache and drop
+    the results of older versions. Queries on user input (postcode search)
+    are only cached once someone runs them.
+    :return: number of cached results
+    """
+    jobs = [
+        (name, {}) for name, sql in DASHBOARD_QUERIES.items()
+        if not text(sql).compile().params
+    ]
+    jobs.append(("top_flips", {"n": TOP_FLIPS}))
+    jobs.append(("monthly_volumes", {"since": volumes_since()}))
+    boroughs = read_query("borough_list", engine, version)["borough"]
+    jobs += [("borough_rollup", {"borough_choice": b}) for b in boroughs]
+
+    for name, params in jobs:
+        read_query(name, engine, version, **params)
+
+    cache_dir = Path(os.getenv("DASHBOARD_CACHE_DIR", DEFAULT_CACHE_DIR))
+    for path in cache_dir.glob("*.arrow"):
+        if not path.name.startswith(f"v{version}-"):
+            path.unlink(missing_ok=True)
+    logger.info(
+        "Warmed %d dashboard queries for dataset version %d",
+        len(jobs), version,
+    )
+    return len(jobs)
+
+
+def volumes_since(today: date = None) -> date:
+    """
+    First day of the monthly volumes window. Bound as :since rather than
+    computed from CURRENT_DATE in SQL, so cached results roll over each day.
+    """
+    today = today or date.today()
+    return (pd.Timestamp(today) - pd.DateOffset(years=VOLUME_YEARS)).date()
+
+
+def _cache_path(name: str, sql: str, version: int, params: dict) -> Path:
+    # keyed on the SQL text too, so editing a query never serves stale rows
+    digest = hashlib.sha256(
+        json.dumps(
+            [os.getenv("DASHBOARD_BACKEND", "postgres"), sql, params],
+            sort_keys=True, default=str,
+        ).encode()
+    ).hexdigest()[:16]
+    cache_dir = Path(os.getenv("DASHBOARD_CACHE_DIR", DEFAULT_CACHE_DIR))
+    return cache_dir / f"v{version}-{name}-{digest}.arrow"
+
+
+def _read_cache(path: Path) -> pd.DataFrame:
+    # bump the mtime first: it is the LRU clock, and it raises if the entry
+    # is gone
+    os.utime(path)
+    with pa.memory_map(str(path)) as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas()
+
+
+def _write_cache(df: pd.DataFrame, path: Path) -> None:
+    # write then rename, so a concurrent reader never sees half a file
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        with pa.OSFile(str(tmp), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp, path)
+        _evict()
+    except (OSError, pa.ArrowException) as e:
+        # a read-only deployment, or a column Arrow cannot convert, still
+        # works: the result is served, it just isn't persisted
+        logger.warning("Could not cache %s: %s", path.name, e)
+
+
+def _evict(max_bytes: int = None) -> None:
+    """
+    Delete the least recently used results until the cache directory fits
+    max_bytes (default DASHBOARD_CACHE_MAX_MB, 512 MB).
+    """
+    if max_bytes is None:
+        max_mb = int(os.getenv("DASHBOARD_CACHE_MAX_MB", "512"))
+        max_bytes = max_mb * 1024 * 1024
+    entries = []
+    cache_dir = Path(os.getenv("DASHBOARD_CACHE_DIR", DEFAULT_CACHE_DIR))
+    for path in cache_dir.glob("*.arrow"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        logger.info("Evicted %s from the dashboard cache", path.name)
+
+
+# --- snapshot backend: the same queries over the Parquet snapshot -----------
+# Each function mirrors the SQL of the same name and reads the live snapshot
+# directory it is given. Filters on the year and borough partition columns
+# prune whole directories before any file is read.
+
+def _dataset(path: Path) -> ds.Dataset:
+    return ds.dataset(path, partitioning="hive")
+
+
+def _group(table: pa.Table, keys: list, aggregations: list) -> pd.DataFrame:
+    grouped = table.group_by(keys, use_threads=True).aggregate(aggregations)
+    return grouped.to_pandas()
+
+
+# the rollup columns of price_rollup_monthly: every sale, the priced ones,
+# their sum
+ROLLUP_AGGREGATIONS = [([], "count_all"), ("price", "count"), ("price", "sum")]
+ROLLUP_NAMES = {
+    "count_all": "n_sales",
+    "price_count": "n_priced",
+    "price_sum": "sum_price",
+}
+
+
+def _snap_home_metrics(path: Path) -> pd.DataFrame:
+    table = _dataset(path).to_table(columns=["price", "date"])
+    # None without a priced sale, as ROUND(NULL) is
+    mean = pc.mean(table["price"]).as_py()
+    return pd.DataFrame({
+        "total_sales": [table.num_rows],
+        "avg_price": [None if mean is None else float(round(mean))],
+        "date_from": [pc.min(table["date"]).as_py()],
+    })
+
+
+def _snap_price_rollup(path: Path) -> pd.DataFrame:
+    columns = ["year", "borough", "property_type", "price"]
+    df = _group(
+        _dataset(path).to_table(columns=columns),
+        ["year", "borough", "property_type"],
+        ROLLUP_AGGREGATIONS,
+    )
+    return df.rename(columns=ROLLUP_NAMES)
+
+
+def _snap_borough_list(path: Path) -> pd.DataFrame:
+    table = _dataset(path).to_table(columns=["borough"])
+    boroughs = pc.unique(table["borough"])
+    return pd.DataFrame({"borough": sorted(boroughs.to_pylist())})
+
+
+def _snap_borough_rollup(path: Path, borough_choice: str) -> pd.DataFrame:
+    table = _dataset(path).to_table(
+        columns=["year", "property_type", "estate_type", "price"],
+        filter=ds.field("borough") == borough_choice,
+    )
+    df = _group(
+        table, ["year", "property_type", "estate_type"], ROLLUP_AGGREGATIONS
+    )
+    return df.rename(columns=ROLLUP_NAMES)
+
+
+def _snap_outcode_heatmap(path: Path) -> pd.DataFrame:
+    # AVG(price) over the priced sales, COUNT(*) over every sale
+    table = _dataset(path).to_table(columns=["outcode", "price"])
+    df = _group(table, ["outcode"], [("price", "mean"), ([], "count_all")])
+    df = df.rename(columns={"price_mean": "avg_price", "count_all": "n_sales"})
+    df["avg_price"] = df["avg_price"].round()
+    return df.sort_values("avg_price", ascending=False, ignore_index=True)
+
+
+def _snap_top_flips(path: Path, n: int) -> pd.DataFrame:
+    # the flips view exported with the snapshot, not recomputed from every sale
+    table = pq.read_table(path / SNAPSHOT_FLIPS, columns=[
+        "postcode", "address", "sale_date", "next_date",
+        "sale_price", "next_price", "months_between", "pct_gain",
+    ])
+    return table.sort_by([("pct_gain", "descending")]).slice(0, n).to_pandas()
+
+
+def _snap_monthly_volumes(path: Path, since: date) -> pd.DataFrame:
+    table = _dataset(path).to_table(
+        columns=["date", "borough"],
+        filter=(ds.field("year") >= since.year) & (ds.field("date") >= since),
+    )
+    df = table.to_pandas()
+    months = pd.to_datetime(df["date"]).dt.to_period("M")
+    df["month"] = months.dt.start_time.dt.date
+    return (
+        df.groupby(["month", "borough"], as_index=False)
+        .size()
+        .rename(columns={"size": "n_sales"})
+    )
+
+
+def _like_prefix(pattern: str) -> str:
+    # LIKE 'prefix%' pattern → the literal prefix
+    return re.sub(r"\\(.)", r"\1", pattern[:-1])
+
+
+def _postcode_filter(pattern: str) -> ds.Expression:
+    # evaluated inside the scan, so only the matching rows are materialised
+    return pc.starts_with(ds.field("postcode"), pattern=_like_prefix(pattern))
+
+
+def _snap_postcode_count(path: Path, pattern: str) -> pd.DataFrame:
+    n_found = _dataset(path).count_rows(filter=_postcode_filter(pattern))
+    return pd.DataFrame({"n_found": [n_found]})
+
+
+def _snap_postcode_search(path: Path, pattern: str, limit: int,
+                          offset: int) -> pd.DataFrame:
+    table = _dataset(path).to_table(
+        columns=["date", "postcode", "price", "property_type", "address"],
+        filter=_postcode_filter(pattern),
+    ).sort_by([
+        ("date", "descending"), ("postcode", "ascending"),
+        ("address", "ascending"),
+    ])
+    return table.slice(offset, limit).to_pandas()
+
 
-def load_heatmap_data():
-    sql = import_sql_query(Path(__file__).parents[1] / "etl/sql/heatmap_outcode.sql")
-    return pd.read_sql(text(sql), engine)
\ No newline at end of file
+SNAPSHOT_QUERIES = {
+    "home_metrics": _snap_home_metrics,
+    "price_rollup": _snap_price_rollup,
+    "borough_list": _snap_borough_list,
+    "borough_rollup": _snap_borough_rollup,
+    "outcode_heatmap": _snap_outcode_heatmap,
+    "top_flips": _snap_top_flips,
+    "monthly_volumes": _snap_monthly_volumes,
+    "postcode_count": _snap_postcode_count,
+    "postcode_search": _snap_postcode_search,
+}
@@ -1,29 +1,23 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
-from sqlalchemy import text
 
-from streamlit_app.config import engine
+from streamlit_app.config import (
+    engine, dataset_version, CACHED_VERSIONS, BOROUGH_CACHE_ENTRIES,
+)
+from streamlit_app.data_access import read_query
 
-@st.cache_data(ttl=3600)
-def load_borough_list() -> list[str]:
+@st.cache_data(max_entries=CACHED_VERSIONS)
+def load_borough_list(version: int) -> list[str]:
     """Fetch distinct borough names for the selector."""
-    df = pd.read_sql(
-        text("SELECT DISTINCT borough FROM clean_house_prices ORDER BY borough"),
-        engine
-    )
-    return df["borough"].tolist()
+    return read_query("borough_list", engine, version)["borough"].tolist()
 
-@st.cache_data(ttl=3600)
-def load_raw_price_data(borough_choice:str) -> pd.DataFrame:
-    sql = text("""
-        SELECT date, borough, property_type, new_build, price, estate_type
-        FROM clean_house_prices
-        WHERE borough = :borough_choice
-    """)
-    df = pd.read_sql(sql, engine, params={"borough_choice": borough_choice})
-    df["year"] = pd.DatetimeIndex(df["date"]).year
-    return df
+@st.cache_data(max_entries=BOROUGH_CACHE_ENTRIES)
+def load_borough_rollup(version: int, borough_choice:str) -> pd.DataFrame:
+    """Sales count and price sum per year, property type and estate type."""
+    return read_query(
+        "borough_rollup", engine, version, borough_choice=borough_choice
+    )
 
 def render():
     st.set_page_config(
@@ -31,10 +25,11 @@ def render():
         page_icon="🏠",
         layout="wide"
     )
-    boroughs = load_borough_list()
+    version = dataset_version()
+    boroughs = load_borough_list(version)
     # print(boroughs)
     borough_choice = st.selectbox('Select a borough', options=boroughs, index=0, help="Choose a borough to analyze")
-    df = load_raw_price_data(borough_choice)
+    df = load_borough_rollup(version, borough_choice)
 
     estate_types = sorted(df["estate_type"].unique())
     estate_types_choice = st.selectbox('Select an estate type', options=['All'] + estate_types, index=0, help='choose an estate type to analyze')
@@ -47,11 +42,14 @@ def render():
         df_sel
         .groupby(['year', 'property_type'], as_index=False)
         .agg(
-            avg_price=('price', 'mean'),
-            n_sales=('price', 'count')
+            sum_price=('sum_price', 'sum'),
+            n_priced=('n_priced', 'sum'),
+            n_sales=('n_sales', 'sum')
         )
     )
-    df_trend['avg_price'] = df_trend['avg_price'].round()
+    df_trend['avg_price'] = (
+        df_trend['sum_price'] / df_trend['n_priced']
+    ).round()
 
     order = ['Detached', 'Semi-detached', 'Terraced', 'Flat']
     st.subheader(f"Average sale price in {borough_choice} (last 5 years)")
@@ -72,7 +70,7 @@ def render():
     st.markdown("#### Sales mix by property type")
 
     df_pies = (df_sel.groupby(["year", "property_type"], as_index=False)
-                    .agg(n_sales=("price", "count"))
+                    .agg(n_sales=("n_sales", "sum"))
                     .sort_values(["year", "property_type"]))
 
     base = (
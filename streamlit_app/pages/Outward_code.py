@@ -1,30 +1,46 @@
 import pandas as pd
 import streamlit as st
 import altair as alt
-from sqlalchemy import text
-from streamlit_app.config import engine
+from streamlit_app.config import engine, dataset_version, CACHED_VERSIONS
+from streamlit_app.data_access import read_query
 
-@st.cache_data(ttl=3600)
-def get_heatmap_data() -> pd.DataFrame:
-    sql = text("""
-        SELECT
-          split_part(postcode, ' ', 1) AS outcode,
-          ROUND(AVG(price))            AS avg_price,
-          COUNT(*)                     AS n_sales
-        FROM clean_house_prices
-        GROUP BY outcode
-        ORDER BY avg_price DESC;
-    """)
-    return pd.read_sql(sql, engine)
+# rows per page of postcode search results
+PAGE_SIZE = 100
 
-@st.cache_data(ttl=3600)
-def get_all_data() -> pd.DataFrame:
-    sql = text("""
-        SELECT
-          date, postcode, price, property_type,address
-        FROM clean_house_prices
-    """)
-    return pd.read_sql(sql, engine)
+# cached searches kept per page (least recently used dropped first)
+SEARCH_CACHE_ENTRIES = 500
+
+@st.cache_data(max_entries=CACHED_VERSIONS)
+def get_heatmap_data(version: int) -> pd.DataFrame:
+    return read_query("outcode_heatmap", engine, version)
+
+def _prefix_pattern(prefix: str) -> str:
+    # LIKE pattern matching postcodes that start with prefix literally
+    escaped = (
+        prefix.replace("\\", "\\\\")
+        .replace("%", "\\%")
+        .replace("_", "\\_")
+    )
+    return f"{escaped}%"
+
+@st.cache_data(max_entries=SEARCH_CACHE_ENTRIES)
+def count_postcode_matches(version: int, prefix: str) -> int:
+    df = read_query(
+        "postcode_count", engine, version, pattern=_prefix_pattern(prefix)
+    )
+    return int(df["n_found"].iloc[0])
+
+@st.cache_data(max_entries=SEARCH_CACHE_ENTRIES)
+def search_postcode(version: int, prefix: str, page: int = 1,
+                    page_size: int = PAGE_SIZE) -> pd.DataFrame:
+    # prefix match runs on the postcode text_pattern_ops index, one page
+    # at a time
+    return read_query(
+        "postcode_search", engine, version,
+        pattern=_prefix_pattern(prefix),
+        limit=page_size,
+        offset=(page - 1) * page_size,
+    )
 
 def render():
     st.set_page_config(
@@ -32,7 +48,8 @@ def render():
         page_icon="🏠",
         layout="wide"
     )
-    df = get_heatmap_data()
+    version = dataset_version()
+    df = get_heatmap_data(version)
     st.subheader("Average sale price by outward code (last 5 years)")
     st.markdown(
         """
@@ -58,13 +75,19 @@ def render():
 
     # Filter results
     if user_postcode:
-        df_all = get_all_data()
-
-        filtered_df = df_all[df_all['postcode'].str.startswith(user_postcode)]
+        n_found = count_postcode_matches(version, user_postcode)
 
-        if not filtered_df.empty:
-            st.success(f"{len(filtered_df)} transactions found for '{user_postcode}'")
-            st.dataframe(filtered_df.sort_values("date", ascending=False), hide_index=True)
+        if n_found:
+            st.success(f"{n_found} transactions found for '{user_postcode}'")
+            n_pages = -(-n_found // PAGE_SIZE)
+            page = st.number_input(
+                f"Page (of {n_pages})",
+                min_value=1, max_value=n_pages, value=1, step=1,
+            )
+            st.dataframe(
+                search_postcode(version, user_postcode, int(page)),
+                hide_index=True,
+            )
         else:
             st.warning("No transactions found for the entered postcode.")
 
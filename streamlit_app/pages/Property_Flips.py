@@ -1,26 +1,12 @@
 import streamlit as st
 import pandas as pd
-from sqlalchemy import text
 
-from streamlit_app.config import engine
+from streamlit_app.config import engine, dataset_version, CACHED_VERSIONS
+from streamlit_app.data_access import read_query, TOP_FLIPS
 
-@st.cache_data(ttl=3600)
-def get_top_flips(limit: int = 5000) -> pd.DataFrame:
-    sql = text(f"""
-        SELECT
-          postcode,
-          address,
-          sale_date,
-          next_date,
-          sale_price,
-          next_price,
-          months_between,
-          pct_gain
-        FROM v_flips_24m
-        ORDER BY pct_gain DESC
-        LIMIT :n;
-    """)
-    return pd.read_sql(sql, engine, params={"n": limit})
+@st.cache_data(max_entries=CACHED_VERSIONS)
+def get_top_flips(version: int, limit: int = TOP_FLIPS) -> pd.DataFrame:
+    return read_query("top_flips", engine, version, n=limit)
 
 def render():
     st.set_page_config(
@@ -29,7 +15,7 @@ def render():
         layout="wide"
     )
     st.subheader("Top property flips (≤ 24 months)")
-    df = get_top_flips()
+    df = get_top_flips(dataset_version())
     if df.empty:
         st.warning("No flip records found.")
         return
@@ -3,30 +3,20 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
-from sqlalchemy import text
 
-from streamlit_app.config import engine
+from streamlit_app.config import engine, dataset_version, CACHED_VERSIONS
+from streamlit_app.data_access import read_query, volumes_since
 
-@st.cache_data(ttl=3600)
-def get_monthly_volumes_by_borough() -> pd.DataFrame:
+@st.cache_data(max_entries=CACHED_VERSIONS)
+def get_monthly_volumes_by_borough(version: int, since) -> pd.DataFrame:
     """
     Returns a DataFrame with:
       - month: first day of month (DATE)
       - borough: borough name
       - n_sales: number of transactions in that month & borough
-    for the last five years.
+    from `since` (five years ago) on.
     """
-    sql = text("""
-        SELECT
-          (date_trunc('month', date))::date AS month,
-          borough,
-          COUNT(*)                        AS n_sales
-        FROM emily_capstone
-        WHERE date >= CURRENT_DATE - INTERVAL '5 years'
-        GROUP BY month, borough
-        ORDER BY month, borough;
-    """)
-    df = pd.read_sql(sql, engine)
+    df = read_query("monthly_volumes", engine, version, since=since)
     # Ensure month is a datetime64 for Altair
     df["month"] = pd.to_datetime(df["month"])
     return df
@@ -44,7 +34,7 @@ def render():
         """
     )
 
-    df = get_monthly_volumes_by_borough()
+    df = get_monthly_volumes_by_borough(dataset_version(), volumes_since())
     if df.empty:
         st.info("No data available.")
         return
@@ -1,6 +1,6 @@
 import os
 import pandas as pd
-from etl.transform.clean_house_prices import clean_house_prices
+from etl.transform.clean_house_prices import clean_house_prices, OUTPUT_SCHEMA, ROW_HASH
 
 
 def test_clean_house_prices():
@@ -13,8 +13,15 @@ def test_clean_house_prices():
 
     df = pd.read_csv(test_data_path)
     expected_df = pd.read_csv(expected_data_path, parse_dates=['date'])
-    expected_df['date'] = expected_df['date'].dt.date
+    expected_df['new_build'] = expected_df['new_build'].map({'Y': True, 'N': False})
+    expected_df = expected_df.astype(
+        {col: dtype for col, dtype in OUTPUT_SCHEMA.items() if col in expected_df}
+    )
 
     result = clean_house_prices(df)
 
-    pd.testing.assert_frame_equal(result.reset_index(drop=True), expected_df)
\ No newline at end of file
+    # the row hash is checked by the unit tests; here only that every sale has its own
+    assert result[ROW_HASH].is_unique
+    pd.testing.assert_frame_equal(
+        result.drop(columns=ROW_HASH).reset_index(drop=True), expected_df
+    )
\ No newline at end of file
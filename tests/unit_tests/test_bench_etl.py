@@ -0,0 +1,19 @@
+from benchmarks import bench_etl
+from benchmarks.synthetic_ppd import write_raw_files
+from etl.extract import extract_house_prices
+
+
+def test_run_once_times_every_step(tmp_path, mocker, monkeypatch):
+    # run_once points the extract at the benchmark files; undone after the test
+    monkeypatch.setattr(extract_house_prices, "RAW_DIR", extract_house_prices.RAW_DIR)
+    write_raw_files(str(tmp_path), 2_000)
+    load_data = mocker.patch("benchmarks.bench_etl.load_data")
+
+    result = bench_etl.run_once(tmp_path)
+
+    [(clean,), _] = load_data.call_args
+    assert result["rows_clean"] == len(clean) > 0
+    steps = list(result["seconds"])
+    assert steps[0] == "extract" and steps[-1] == "load"
+    assert any(step.startswith("transform.") for step in steps[1:-1])
+    assert all(seconds >= 0 for seconds in result["seconds"].values())
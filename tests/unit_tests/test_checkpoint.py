@@ -0,0 +1,101 @@
+import pandas as pd
+import pytest
+
+from etl.load.checkpoint import (
+    open_checkpoint,
+    pipeline_version,
+    mark_done,
+    completed_stages,
+    resume_stage,
+    load_frame,
+)
+
+
+def clean_rows():
+    return pd.DataFrame({
+        "price": pd.array([100, None], dtype="Int64"),
+        "date": pd.to_datetime(["2023-01-05", "2024-02-01"]).astype("datetime64[s]"),
+        "borough": pd.Categorical(["Hackney", "Brent"]),
+        "new_build": pd.array([True, False], dtype="boolean"),
+    })
+
+
+def test_checkpoint_round_trips_frame_with_dtypes(tmp_path):
+    path = open_checkpoint({"Hackney": "abc"}, tmp_path)
+    df = clean_rows()
+
+    mark_done(path, "extract", df)
+
+    assert completed_stages(path) == ["extract"]
+    pd.testing.assert_frame_equal(load_frame(path, "extract"), df)
+
+
+def test_resume_stage_is_first_unfinished(tmp_path):
+    path = open_checkpoint({"Hackney": "abc"}, tmp_path)
+    assert resume_stage(path) == "extract"
+
+    mark_done(path, "extract", clean_rows())
+    mark_done(path, "transform", clean_rows())
+    assert resume_stage(path) == "load"
+
+    mark_done(path, "load")
+    mark_done(path, "enrich")
+    assert resume_stage(path) is None
+
+
+def test_redoing_a_stage_invalidates_later_ones(tmp_path):
+    path = open_checkpoint({"Hackney": "abc"}, tmp_path)
+    for stage in ("extract", "transform", "load"):
+        mark_done(path, stage, clean_rows() if stage != "load" else None)
+
+    mark_done(path, "transform", clean_rows())
+
+    assert completed_stages(path) == ["extract", "transform"]
+
+
+def test_new_source_files_start_a_new_checkpoint(tmp_path):
+    old = open_checkpoint({"Hackney": "abc"}, tmp_path)
+    mark_done(old, "extract", clean_rows())
+
+    new = open_checkpoint({"Hackney": "def"}, tmp_path)
+
+    assert new != old
+    assert not old.exists()
+    assert resume_stage(new) == "extract"
+    with pytest.raises(ValueError, match="No extract checkpoint"):
+        load_frame(new, "extract")
+
+
+def test_new_pipeline_version_starts_a_new_checkpoint(tmp_path):
+    old = open_checkpoint({"Hackney": "abc"}, tmp_path, version="v1")
+    mark_done(old, "transform", clean_rows())
+
+    new = open_checkpoint({"Hackney": "abc"}, tmp_path, version="v2")
+
+    assert new != old
+    assert not old.exists()
+    assert resume_stage(new) == "extract"
+
+
+def test_pipeline_version_follows_dedup_key(monkeypatch):
+    monkeypatch.delenv("DEDUP_KEY", raising=False)
+    default = pipeline_version()
+
+    monkeypatch.setenv("DEDUP_KEY", "price,date,postcode,address")
+
+    assert pipeline_version() != default
+
+
+def test_pipeline_version_follows_imported_utils(tmp_path, monkeypatch):
+    (tmp_path / "transform").mkdir()
+    (tmp_path / "transform" / "clean.py").write_text("from utils import dates")
+    (tmp_path / "dates.py").write_text("FORMAT = '%Y-%m-%d'")
+    monkeypatch.setattr(
+        "etl.load.checkpoint.VERSIONED_CODE",
+        [tmp_path / "transform", tmp_path / "dates.py"],
+    )
+    before = pipeline_version()
+
+    (tmp_path / "dates.py").write_text("FORMAT = '%d/%m/%Y'")
+
+    assert pipeline_version() != before
@@ -3,7 +3,7 @@ import pandas as pd
 import numpy as np
 from datetime import date
 
-from etl.transform.clean_house_prices import remove_missing, select_and_rename, standardise_types, map_codes, remove_other_types, build_address, deduplicate, remove_non_standard_transaction, clean_house_prices
+from etl.transform.clean_house_prices import remove_missing, select_and_rename, standardise_types, normalise_text, map_codes, add_postcode_parts, remove_other_types, build_address, deduplicate, remove_non_standard_transaction, clean_house_prices, clean_house_price_chunks, clean_house_price_deltas, OUTPUT_SCHEMA, CLEAN_STAGES, clean_house_prices_parallel, row_hash, ROW_HASH
 
 def test_remove_missing():
     df = pd.DataFrame({
@@ -48,9 +48,34 @@ def test_standardise_types():
     std = standardise_types(df.copy())
     assert std['price'].iloc[0] == 100
     assert pd.isna(std['price'].iloc[1])
-    assert std['date'].iloc[0] == date(2021, 3, 3)
+    assert std['date'].iloc[0] == pd.Timestamp(2021, 3, 3)
     assert pd.isna(std['date'].iloc[1])
 
+def test_standardise_types_rejects_fractional_prices():
+    df = pd.DataFrame({'price': ['250000.50', '3000000000', '250000.0', None]})
+    std = standardise_types(df.copy())
+    assert pd.isna(std['price'].iloc[0])
+    assert std['price'].iloc[1:3].tolist() == [3_000_000_000, 250_000]
+    assert pd.isna(std['price'].iloc[3])
+
+def test_normalise_text():
+    df = pd.DataFrame({
+        'postcode': ['sw11  1ad', 'SW111AD', None],
+        'borough': ['wandsworth', 'WANDSWORTH', 'Wandsworth'],
+        'street': [' LAVENDER HILL', 'lavender hill', None],
+    })
+    out = normalise_text(df.copy())
+    assert out['postcode'].tolist() == ['SW11 1AD', 'SW11 1AD', None]
+    assert out['borough'].tolist() == ['Wandsworth'] * 3
+    assert out['street'].tolist() == ['Lavender Hill', 'Lavender Hill', None]
+
+def test_add_postcode_parts():
+    df = pd.DataFrame({'postcode': ['SW18 1AA', 'EC1V 3NY', 'SW18']})
+    out = add_postcode_parts(df)
+    assert out['outcode'].tolist() == ['SW18', 'EC1V', 'SW18']
+    assert out['postcode_sector'].tolist() == ['SW18 1', 'EC1V 3', None]
+    assert out['postcode_area'].tolist() == ['SW', 'EC', 'SW']
+
 def test_map_codes():
     df = pd.DataFrame({
         'property_type': ['F', 'S', 'X'],
@@ -88,11 +113,69 @@ def test_build_address():
     for col in ['saon', 'paon', 'street']:
         assert col not in out.columns
 
+def test_build_address_part_combinations():
+    df = pd.DataFrame({
+        'saon': ['Flat 1', ' Flat 2 ', 'Flat 3', None, '  ', 4.0],
+        'paon': ['10', None, '', '12A', None, None],
+        'street': ['High Rd', 'Low Rd', None, None, '', 'Main St'],
+    })
+    out = build_address(df.copy())
+    assert out['address'].tolist() == [
+        'Flat 1, 10 High Rd',
+        'Flat 2 Low Rd',
+        'Flat 3',
+        '12A',
+        None,
+        '4.0 Main St',
+    ]
+
 def test_deduplicate():
     df = pd.DataFrame({'a': [1, 1, 2], 'b': [3, 3, 4]})
     out = deduplicate(df)
     assert len(out) == 2
 
+def test_deduplicate_ignores_transaction_id():
+    df = pd.DataFrame({
+        'transaction_id': ['a', 'b', 'c', 'c'],
+        'price': [1, 1, 2, 3],
+    })
+    out = deduplicate(df)
+    # 'a'/'b' are the same sale; 'c' was re-issued with a new price, and
+    # the first version is kept, as the streamed path has to
+    assert out['transaction_id'].tolist() == ['a', 'c']
+    assert out['price'].tolist() == [1, 2]
+
+def test_deduplicate_catches_whitespace_and_case_near_duplicates():
+    df = pd.DataFrame({
+        'price': [100, 100, 100],
+        'address': ['Flat 1, 2 High St', ' flat 1,  2 HIGH ST', 'Flat 1, 3 High St'],
+    })
+    out = deduplicate(df)
+    assert out['address'].tolist() == ['Flat 1, 2 High St', 'Flat 1, 3 High St']
+    assert out[ROW_HASH].dtype == 'int64'
+
+def test_deduplicate_on_configured_key(monkeypatch):
+    monkeypatch.setenv('DEDUP_KEY', 'price, postcode')
+    df = pd.DataFrame({
+        'price': [100, 100, 200],
+        'postcode': ['E1 1AA', 'E1 1AA', 'E1 1AA'],
+        'new_build': ['Y', 'N', 'N'],
+    })
+    assert deduplicate(df)['new_build'].tolist() == ['Y', 'N']
+
+def test_row_hash_is_stable():
+    # the hash is persisted as the upsert key: changing it needs a full reload
+    df = pd.DataFrame({
+        'price': pd.array([250000, None], dtype='Int64'),
+        'date': pd.to_datetime(['2021-03-05', '2022-01-01']),
+        'postcode': ['SW11 1AD', None],
+    })
+    same = df.assign(price=[250000.0, None], postcode=['sw11  1ad', None])
+    assert row_hash(df).tolist() == row_hash(same).tolist()
+    assert row_hash(df).tolist() == [2403668340947339258, -1830233618661546700]
+    # the default key is in column name order, whatever the source order
+    assert row_hash(df[['postcode', 'price', 'date']]).tolist() == row_hash(df).tolist()
+
 def test_clean_house_prices_pipeline():
     raw = pd.DataFrame({
         'price_paid': ['500', None, '1000'],
@@ -113,6 +196,148 @@ def test_clean_house_prices_pipeline():
     assert len(cleaned) == 2
     row = cleaned.iloc[0]
     assert row['price'] == 500.0
-    assert row['date'] == date(2020, 1, 1)
+    assert row['date'] == pd.Timestamp(2020, 1, 1)
     assert row['transaction_category'] == 'A'
-    assert 'address' in cleaned.columns
\ No newline at end of file
+    assert 'address' in cleaned.columns
+
+def test_clean_house_price_chunks_dedups_across_chunks():
+    def chunk(prices):
+        n = len(prices)
+        return pd.DataFrame({
+            'price_paid': prices,
+            'deed_date': ['2020-01-01'] * n,
+            'postcode': ['E1'] * n,
+            'property_type': ['F'] * n,
+            'new_build': ['N'] * n,
+            'estate_type': ['L'] * n,
+            'saon': [None] * n,
+            'paon': ['1'] * n,
+            'street': ['St1'] * n,
+            'borough': ['Br'] * n,
+            'transaction_category': ['A'] * n,
+        })
+
+    out = list(clean_house_price_chunks([chunk(['1', '2']), chunk(['2', '3']), chunk(['1'])]))
+
+    # the last chunk only holds a duplicate, so nothing is yielded for it
+    assert len(out) == 2
+    assert pd.concat(out)['price'].tolist() == [1, 2, 3]
+
+def test_clean_house_price_chunks_keep_the_rows_of_a_single_frame():
+    raw = pd.DataFrame({
+        # id 1 is re-issued in the second chunk; 300 is sold twice under two ids
+        'unique_id': ['{1}', '{2}', '{1}', '{3}', '{4}'],
+        'price_paid': [100, 300, 150, 300, 400],
+        'deed_date': ['2020-01-01'] * 5,
+        'postcode': ['E1'] * 5,
+        'property_type': ['F'] * 5,
+        'paon': ['1', '2', '1', '2', '4'],
+        'borough': ['Br'] * 5,
+        'transaction_category': ['A'] * 5,
+    })
+
+    out = pd.concat(clean_house_price_chunks([raw.iloc[:2], raw.iloc[2:]]))
+
+    pd.testing.assert_frame_equal(out, clean_house_prices(raw.copy()))
+    assert out['transaction_id'].tolist() == ['1', '2', '4']
+
+
+def test_clean_house_price_deltas():
+    raw = pd.DataFrame({
+        'unique_id': ['{A1}', '{C1}', '{C2}', '{D1}', '{A2}', '{A2}'],
+        'record_status': ['A', 'C', 'C', 'D', 'A', 'D'],
+        'price_paid': ['500', '600', '700', None, '800', None],
+        'deed_date': ['2024-01-01'] * 6,
+        'postcode': ['E1'] * 6,
+        'property_type': ['F', 'F', 'F', None, 'F', None],
+        'new_build': ['N'] * 6,
+        'estate_type': ['L'] * 6,
+        'saon': [None] * 6,
+        'paon': ['1', '2', '3', None, '4', None],
+        'street': ['St'] * 6,
+        'borough': ['Br'] * 6,
+        # C2 is changed into a non-standard (B) sale
+        'transaction_category': ['A', 'A', 'B', None, 'A', None],
+    })
+    upserts, deletes = clean_house_price_deltas(raw)
+    assert upserts['transaction_id'].tolist() == ['A1', 'C1']
+    assert 'record_status' not in upserts.columns
+    assert sorted(deletes) == ['A2', 'C2', 'D1']
+
+
+def test_clean_house_prices_output_schema():
+    raw = pd.DataFrame({
+        'unique_id': ['{a}', '{b}'],
+        'price_paid': [100, 200],
+        'deed_date': ['2020-01-01', '2021-06-30'],
+        'postcode': ['E1 1AA', 'E1 1AB'],
+        'property_type': ['F', 'T'],
+        'new_build': ['Y', 'N'],
+        'estate_type': ['L', 'F'],
+        'borough': ['Hackney', 'Hackney'],
+        'transaction_category': ['A', 'A'],
+    })
+
+    cleaned = clean_house_prices(raw)
+
+    assert {c: str(t) for c, t in cleaned.dtypes.items()} == {
+        c: t for c, t in OUTPUT_SCHEMA.items() if c in cleaned
+    }
+    assert cleaned['new_build'].tolist() == [True, False]
+
+def test_clean_house_prices_keeps_prices_above_int32():
+    raw = pd.DataFrame({
+        'price_paid': ['3000000000', '250000.50'],
+        'deed_date': ['2020-01-01', '2021-06-30'],
+        'postcode': ['E1 1AA', 'E1 1AB'],
+        'property_type': ['D', 'F'],
+        'new_build': ['N', 'N'],
+        'estate_type': ['F', 'L'],
+        'borough': ['City Of London', 'Hackney'],
+        'transaction_category': ['A', 'A'],
+    })
+
+    cleaned = clean_house_prices(raw)
+
+    assert cleaned['price'].tolist() == [3_000_000_000, pd.NA]
+
+def test_clean_house_prices_records_stage_metrics():
+    raw = pd.DataFrame({
+        'price_paid': ['500', None, '1000'],
+        'deed_date': ['2020-01-01', '2020-01-02', '2020-01-02'],
+        'postcode': ['E1', 'E2', 'E3'],
+        'property_type': ['F', 'F', 'O'],
+        'borough': ['Br', 'Br', 'Br'],
+        'transaction_category': ['A', 'A', 'A'],
+    })
+    metrics = []
+
+    clean_house_prices(raw, metrics)
+
+    assert [m['stage'] for m in metrics] == [s.__name__ for s in CLEAN_STAGES]
+    rows = {m['stage']: (m['rows_in'], m['rows_out']) for m in metrics}
+    assert rows['remove_missing'] == (3, 2)
+    assert rows['remove_other_types'] == (2, 1)
+    assert metrics[-1]['rows_out'] == 1
+
+@pytest.mark.parametrize('shard_by', ['rows', 'borough'])
+def test_clean_house_prices_parallel_matches_serial(shard_by):
+    boroughs = ['Brent', 'Hackney', 'Brent', 'Hackney', 'Hackney', 'Brent', 'Hackney', 'Brent']
+    raw = pd.DataFrame({
+        # id 1 is reused in the last shard; rows 3 and 6 are the same Brent sale under two ids
+        'unique_id': ['{1}', '{2}', '{3}', '{4}', '{5}', '{6}', '{7}', '{1}'],
+        'price_paid': [100, 200, 300, 400, 500, 300, 700, 800],
+        'deed_date': ['2020-01-01'] * 8,
+        'postcode': ['E1'] * 8,
+        'property_type': ['F', 'T', 'S', 'F', 'O', 'S', 'D', 'F'],
+        'paon': ['1', '2', '3', '4', '5', '3', '7', '8'],
+        'borough': boroughs,
+        'transaction_category': ['A', 'A', 'A', 'B', 'A', 'A', 'A', 'A'],
+    }, index=range(10, 18))
+    metrics = []
+
+    parallel = clean_house_prices_parallel(raw.copy(), metrics, max_workers=3, shard_by=shard_by, min_rows=0)
+
+    pd.testing.assert_frame_equal(parallel, clean_house_prices(raw.copy()))
+    assert parallel['transaction_id'].tolist() == ['1', '2', '3', '7']
+    assert 'deduplicate_shards' in [m['stage'] for m in metrics]
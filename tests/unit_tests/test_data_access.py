@@ -0,0 +1,214 @@
+import os
+import pytest
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datetime import date
+from unittest.mock import MagicMock
+
+import streamlit_app.data_access as data_access
+from etl.load.snapshot import export_snapshot
+from streamlit_app.data_access import read_query, warm_cache, _evict, _snap_home_metrics
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("DASHBOARD_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_read_query_persists_per_version(mocker, cache_dir):
+    read_sql = mocker.patch(
+        "streamlit_app.data_access.pd.read_sql",
+        return_value=pd.DataFrame({"borough": ["Brent", "Hackney"]}),
+    )
+
+    first = read_query("borough_list", MagicMock(), 3)
+    again = read_query("borough_list", MagicMock(), 3)
+    read_query("borough_list", MagicMock(), 4)
+
+    pd.testing.assert_frame_equal(first, again)
+    assert read_sql.call_count == 2
+    assert len(list(cache_dir.glob("*.arrow"))) == 2
+
+
+def test_read_query_keys_on_params(mocker, cache_dir):
+    read_sql = mocker.patch(
+        "streamlit_app.data_access.pd.read_sql",
+        side_effect=lambda sql, engine, params: pd.DataFrame({"n": [params["n"]]}),
+    )
+
+    assert read_query("top_flips", MagicMock(), 1, n=5)["n"].item() == 5
+    assert read_query("top_flips", MagicMock(), 1, n=10)["n"].item() == 10
+    assert read_sql.call_count == 2
+
+
+def test_warm_cache_runs_every_query_and_drops_old_versions(mocker, cache_dir):
+    (cache_dir / "v1-borough_list-0.arrow").touch()
+    read_sql = mocker.patch(
+        "streamlit_app.data_access.pd.read_sql",
+        return_value=pd.DataFrame({"borough": ["Brent", "Hackney"]}),
+    )
+
+    n = warm_cache(MagicMock(), 2)
+
+    # four unparameterised queries, the top flips, the monthly volumes and one rollup per borough
+    assert n == 4 + 1 + 1 + 2
+    assert read_sql.call_count == n
+    assert all(p.name.startswith("v2-") for p in cache_dir.glob("*.arrow"))
+
+
+def test_read_query_keys_on_sql_text(mocker, cache_dir):
+    read_sql = mocker.patch(
+        "streamlit_app.data_access.pd.read_sql",
+        return_value=pd.DataFrame({"borough": ["Brent"]}),
+    )
+
+    read_query("borough_list", MagicMock(), 1)
+    mocker.patch.dict(data_access.DASHBOARD_QUERIES, {"borough_list": "SELECT 'Brent' AS borough"})
+    read_query("borough_list", MagicMock(), 1)
+
+    assert read_sql.call_count == 2
+
+
+def test_monthly_volumes_window_rolls_over_daily(mocker, cache_dir):
+    read_sql = mocker.patch(
+        "streamlit_app.data_access.pd.read_sql",
+        side_effect=lambda sql, engine, params: pd.DataFrame({"since": [params["since"]]}),
+    )
+
+    assert data_access.volumes_since(date(2025, 6, 30)) == date(2020, 6, 30)
+    for today in (date(2025, 6, 30), date(2025, 6, 30), date(2025, 7, 1)):
+        read_query("monthly_volumes", MagicMock(), 1, since=data_access.volumes_since(today))
+
+    # one query per day, not one per dataset version
+    assert read_sql.call_count == 2
+
+
+def test_read_query_serves_results_arrow_cannot_cache(mocker, cache_dir):
+    # a column of mixed ints and text has no Arrow type
+    mocker.patch(
+        "streamlit_app.data_access.pd.read_sql",
+        return_value=pd.DataFrame({"borough": [1, "Brent"]}),
+    )
+
+    assert read_query("borough_list", MagicMock(), 1)["borough"].tolist() == [1, "Brent"]
+    assert not list(cache_dir.glob("*.arrow"))
+
+
+def test_read_query_replaces_a_corrupt_entry(mocker, cache_dir):
+    read_sql = mocker.patch(
+        "streamlit_app.data_access.pd.read_sql",
+        return_value=pd.DataFrame({"borough": ["Brent"]}),
+    )
+    read_query("borough_list", MagicMock(), 1)
+    [path] = cache_dir.glob("*.arrow")
+    path.write_bytes(b"not arrow")
+
+    assert read_query("borough_list", MagicMock(), 1)["borough"].tolist() == ["Brent"]
+    assert read_query("borough_list", MagicMock(), 1)["borough"].tolist() == ["Brent"]
+    assert read_sql.call_count == 2
+
+
+def test_evict_drops_least_recently_used_first(cache_dir):
+    for i, name in enumerate(["old", "mid", "new"]):
+        path = cache_dir / f"{name}.arrow"
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (i, i))
+
+    _evict(max_bytes=250)
+
+    assert sorted(p.stem for p in cache_dir.glob("*.arrow")) == ["mid", "new"]
+
+
+@pytest.fixture
+def snapshot(mocker, monkeypatch, tmp_path, cache_dir):
+    rows = pd.DataFrame({
+        # the last sale has no price: counted in n_sales, not in n_priced
+        "price": pd.array([100_000, 150_000, 300_000, 400_000, 500_000, None], dtype="Int64"),
+        "date": [date(2020, 1, 1), date(2020, 11, 1), date(2021, 6, 1),
+                 date(2022, 3, 1), date(2022, 3, 2), date(2021, 6, 15)],
+        "postcode": ["E1 1AA", "E1 1AA", "E1_2BB", "SW1A 1AA", "SW1A 1AA", "E1 3CC"],
+        "outcode": ["E1", "E1", "E1_2BB", "SW1A", "SW1A", "E1"],
+        "property_type": ["Flat", "Flat", "Terraced", "Flat", "Flat", "Terraced"],
+        "estate_type": ["Leasehold", "Leasehold", "Freehold", "Leasehold", "Leasehold", "Freehold"],
+        "borough": ["Hackney", "Hackney", "Hackney", "Westminster", "Westminster", "Hackney"],
+        "address": ["1 High St", "1 High St", "2 High St", "3 Low Rd", "4 Low Rd", "6 High St"],
+    })
+    flips = pd.DataFrame({
+        "postcode": ["E1 1AA", "SW1A 1AA"], "address": ["1 High St", "3 Low Rd"],
+        "sale_date": [date(2020, 1, 1), date(2021, 1, 1)], "next_date": [date(2020, 11, 1), date(2022, 1, 1)],
+        "sale_price": [100_000, 300_000], "next_price": [150_000, 400_000],
+        "months_between": [10, 12], "pct_gain": [50, 33],
+    })
+    mocker.patch("etl.load.snapshot.pd.read_sql", side_effect=[iter([rows]), flips])
+    mocker.patch(
+        "etl.load.snapshot._arrow_schema",
+        side_effect=lambda conn, relation: pa.Schema.from_pandas(
+            flips if relation.startswith("mv_") else rows, preserve_index=False
+        ),
+    )
+    export_snapshot(MagicMock(), 1, path=tmp_path / "snapshot")
+    monkeypatch.setenv("SNAPSHOT_DIR", str(tmp_path / "snapshot"))
+    monkeypatch.setenv("DASHBOARD_BACKEND", "snapshot")
+    return mocker.patch("streamlit_app.data_access.pd.read_sql")
+
+
+def test_snapshot_backend_rollups(snapshot):
+    df = read_query("borough_rollup", None, 1, borough_choice="Hackney")
+
+    assert df.sort_values("year").to_dict("list") == {
+        "year": [2020, 2021],
+        "property_type": ["Flat", "Terraced"],
+        "estate_type": ["Leasehold", "Freehold"],
+        "n_sales": [2, 2],
+        "n_priced": [2, 1],
+        "sum_price": [250_000, 300_000],
+    }
+    assert read_query("borough_list", None, 1)["borough"].tolist() == ["Hackney", "Westminster"]
+    snapshot.assert_not_called()
+
+
+def test_snapshot_backend_flips_and_search(snapshot):
+    flips = read_query("top_flips", None, 1, n=1)
+    assert flips[["address", "months_between", "pct_gain"]].values.tolist() == [["1 High St", 10, 50]]
+
+    # the LIKE escape of the page is undone: "_" is a literal here
+    found = read_query("postcode_search", None, 1, pattern="E1\\_%", limit=10, offset=0)
+    assert found["postcode"].tolist() == ["E1_2BB"]
+    assert read_query("postcode_count", None, 1, pattern="SW1A%")["n_found"].item() == 2
+    snapshot.assert_not_called()
+
+
+def test_snapshot_backend_outcode_heatmap(snapshot):
+    df = read_query("outcode_heatmap", None, 1)
+    assert df.to_dict("list") == {
+        "outcode": ["SW1A", "E1_2BB", "E1"],
+        "avg_price": [450_000, 300_000, 125_000],
+        "n_sales": [2, 1, 3],
+    }
+    snapshot.assert_not_called()
+
+
+def test_snapshot_backend_monthly_volumes(snapshot):
+    df = read_query("monthly_volumes", None, 1, since=date(2021, 1, 1))
+    assert df.to_dict("list") == {
+        "month": [date(2021, 6, 1), date(2022, 3, 1)],
+        "borough": ["Hackney", "Westminster"],
+        "n_sales": [2, 2],
+    }
+    snapshot.assert_not_called()
+
+
+def test_snapshot_home_metrics_without_a_priced_sale(tmp_path):
+    table = pa.table({
+        "price": pa.array([None, None], pa.int32()),
+        "date": [date(2021, 6, 1), date(2020, 1, 1)],
+    })
+    pq.write_table(table, tmp_path / "part-0.parquet")
+
+    df = _snap_home_metrics(tmp_path)
+
+    assert df.to_dict("list") == {
+        "total_sales": [2], "avg_price": [None], "date_from": [date(2020, 1, 1)],
+    }
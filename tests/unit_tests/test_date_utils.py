@@ -0,0 +1,26 @@
+import pandas as pd
+from utils.date_utils import parse_dates
+
+
+def test_parse_dates_tries_each_format():
+    values = pd.Series(['2021-03-03', '2021-03-03 00:00', '05/04/2020', '2021-03-03', None], index=[4, 3, 2, 1, 0])
+    dates, failed = parse_dates(values)
+    assert dates.dtype == 'datetime64[ns]'
+    assert dates.index.tolist() == [4, 3, 2, 1, 0]
+    assert dates.iloc[:4].tolist() == [pd.Timestamp(2021, 3, 3)] * 2 + [pd.Timestamp(2020, 4, 5), pd.Timestamp(2021, 3, 3)]
+    assert pd.isna(dates.iloc[4])
+    assert failed.empty
+
+
+def test_parse_dates_counts_failures():
+    values = pd.Series(['N/A', '2021-03-03', '31/02/2020', 'N/A', ''])
+    dates, failed = parse_dates(values)
+    assert dates.isna().tolist() == [True, False, True, True, True]
+    assert failed.to_dict() == {'N/A': 2, '31/02/2020': 1, '': 1}
+
+
+def test_parse_dates_passes_datetimes_through():
+    values = pd.Series(pd.to_datetime(['2021-03-03']))
+    dates, failed = parse_dates(values)
+    assert dates is values
+    assert failed.empty
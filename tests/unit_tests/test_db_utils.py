@@ -5,6 +5,8 @@ from unittest.mock import MagicMock
 from utils.db_utils import (
     get_db_connection,
     create_db_engine,
+    get_db_engine,
+    dispose_db_engines,
     DatabaseConnectionError,
 )
 
@@ -197,3 +199,23 @@ def test_create_db_engine_failure(mocker, connection_params):
     mock_logger.error.assert_called_once_with(
         "Invalid Connection Parameters: Invalid connection parameters"
     )
+
+
+def test_get_db_engine_is_shared_per_config(mocker, connection_params):
+    dispose_db_engines()
+    mock_create_engine = mocker.patch(
+        "utils.db_utils.create_engine", side_effect=lambda *a, **kw: MagicMock()
+    )
+
+    first = get_db_engine(connection_params)
+    assert get_db_engine(dict(connection_params)) is first
+    assert get_db_engine({**connection_params, "dbname": "other_db"}) is not first
+    assert get_db_engine(connection_params, pool_size=1) is not first
+
+    assert mock_create_engine.call_count == 3
+    kwargs = mock_create_engine.call_args_list[0].kwargs
+    assert kwargs["pool_pre_ping"] is True
+    assert {"pool_size", "max_overflow", "pool_recycle"} <= kwargs.keys()
+
+    dispose_db_engines()
+    first.dispose.assert_called_once()
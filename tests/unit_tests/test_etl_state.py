@@ -0,0 +1,41 @@
+import pandas as pd
+from datetime import date
+from unittest.mock import MagicMock
+from sqlalchemy.exc import ProgrammingError
+
+from etl.load.etl_state import (
+    update_watermarks,
+    changed_boroughs,
+    load_dataset_version,
+)
+
+
+def test_update_watermarks_keeps_max_per_borough():
+    watermarks = {'Brent': date(2024, 1, 1)}
+    df = pd.DataFrame({
+        'borough': ['Brent', 'Brent', 'Hackney'],
+        'date': [date(2023, 5, 1), date(2023, 6, 1), date(2024, 2, 1)],
+    })
+
+    update_watermarks(watermarks, df)
+
+    assert watermarks == {'Brent': date(2024, 1, 1), 'Hackney': date(2024, 2, 1)}
+
+
+def test_changed_boroughs():
+    state = {
+        'Brent': {'source_fingerprint': 'aaa'},
+        'Hackney': {'source_fingerprint': 'bbb'},
+    }
+    fingerprints = {'Brent': 'aaa', 'Hackney': 'ccc', 'Greenwich': 'ddd'}
+
+    assert changed_boroughs(state, fingerprints) == ['Hackney', 'Greenwich']
+
+
+def test_load_dataset_version_before_first_load():
+    engine = MagicMock()
+    engine.connect.return_value.__enter__.return_value.execute.side_effect = (
+        ProgrammingError("SELECT", {}, Exception("relation does not exist"))
+    )
+
+    assert load_dataset_version(engine) == 0
@@ -5,12 +5,17 @@ import timeit
 
 from etl.extract.extract_house_prices import (
     _load_one,
+    extract_house_prices_chunks,
+    extract_monthly_update,
     extract_house_prices,
     RAW_FILES,
+    RAW_DTYPES,
+    CSV_ENGINES,
     TYPE_DESCRIPTION,
     EXPECTED_PER_ROW,
     logger,
 )
+from etl.transform.clean_house_prices import standardise_types
 from utils.logging_utils import log_extract_success
 
 @pytest.fixture
@@ -84,4 +89,114 @@ def test_log_extract_success_customers(
 #     # Verify that the error was logged
 #     mock_logger.error.assert_called_once_with(
 #          f"Error loading {FILE_PATH}: Failed to load CSV file: {FILE_PATH}"
-#     )
\ No newline at end of file
+#     )
+
+def test_load_one_passes_explicit_schema(mocker):
+    mock_read_csv = mocker.patch(
+        "etl.extract.extract_house_prices.pd.read_csv",
+        return_value=pd.DataFrame({
+            'price_paid': [100],
+            'deed_date': ['2020-01-01'],
+        })
+    )
+
+    df = _load_one("Brent", "unclean_brent.csv")
+
+    assert mock_read_csv.call_args.kwargs["dtype"] == RAW_DTYPES
+    assert df['deed_date'].dtype == 'datetime64[ns]'
+    assert df['borough'].tolist() == ['Brent']
+
+
+def test_load_one_coerces_bad_dates(mocker):
+    mocker.patch(
+        "etl.extract.extract_house_prices.pd.read_csv",
+        return_value=pd.DataFrame({'deed_date': ['2020-01-01', 'not a date']})
+    )
+
+    df = _load_one("Brent", "unclean_brent.csv")
+
+    assert df['deed_date'].iloc[0] == pd.Timestamp(2020, 1, 1)
+    assert pd.isna(df['deed_date'].iloc[1])
+
+
+def test_load_one_pyarrow_engine(mocker, tmp_path):
+    (tmp_path / "brent.csv").write_text(
+        "price_paid,deed_date,paon,saon\n"
+        "100,2020-01-01,12,\n"
+    )
+    mocker.patch("etl.extract.extract_house_prices.RAW_DIR", str(tmp_path))
+
+    df = _load_one("Brent", "brent.csv", csv_engine="pyarrow")
+
+    # paon stays text instead of being inferred as a float
+    assert df['paon'].tolist() == ['12']
+    assert pd.isna(df['saon'].iloc[0])
+    assert df['price_paid'].tolist() == ['100']
+    assert df['borough'].tolist() == ['Brent']
+
+
+@pytest.mark.parametrize("csv_engine", CSV_ENGINES)
+def test_extract_house_prices_keeps_non_numeric_prices(mocker, tmp_path, csv_engine):
+    for filename in RAW_FILES.values():
+        (tmp_path / filename).write_text(
+            "price_paid,deed_date\n100,2020-01-01\nabc,2020-01-02\n\u2014,2020-01-03\n",
+            encoding="utf-8",
+        )
+    mocker.patch("etl.extract.extract_house_prices.RAW_DIR", str(tmp_path))
+    mocker.patch("etl.extract.extract_house_prices.log_extract_success")
+
+    df = extract_house_prices(csv_engine=csv_engine)
+
+    # read as text; standardise_types turns the dirty prices into NaN
+    assert df['price_paid'].tolist()[:3] == ['100', 'abc', '\u2014']
+    assert standardise_types(df.rename(columns={'price_paid': 'price'}))['price'].isna().sum() == 2 * len(RAW_FILES)
+
+
+def test_extract_house_prices_keeps_borough_order(mocker):
+    mocker.patch(
+        "etl.extract.extract_house_prices.pd.read_csv",
+        side_effect=lambda *args, **kwargs: pd.DataFrame({'price_paid': [1]})
+    )
+    mocker.patch("etl.extract.extract_house_prices.log_extract_success")
+
+    df = extract_house_prices(max_workers=2)
+
+    assert df['borough'].tolist() == list(RAW_FILES)
+
+
+def test_extract_house_prices_unknown_engine():
+    with pytest.raises(Exception, match="Unknown CSV engine: nope"):
+        extract_house_prices(csv_engine="nope")
+
+
+def test_extract_house_prices_chunks(mocker, tmp_path):
+    for filename in RAW_FILES.values():
+        (tmp_path / filename).write_text(
+            "price_paid,deed_date\n1,2020-01-01\n2,2020-01-02\n3,2020-01-03\n"
+        )
+    mocker.patch("etl.extract.extract_house_prices.RAW_DIR", str(tmp_path))
+    mock_log = mocker.patch("etl.extract.extract_house_prices.log_extract_success")
+
+    chunks = list(extract_house_prices_chunks(chunksize=2))
+
+    assert [len(c) for c in chunks] == [2, 1] * len(RAW_FILES)
+    assert chunks[0]['borough'].iloc[0] == list(RAW_FILES)[0]
+    assert mock_log.call_args[0][2] == (3 * len(RAW_FILES), 3)
+
+
+def test_extract_monthly_update_keeps_our_boroughs(mocker, tmp_path):
+    path = tmp_path / "pp-monthly-update.csv"
+    path.write_text(
+        '"{ID-1}","500000","2024-12-15 00:00","W1A 1AA","F","N","L","1","",'
+        '"High St","","LONDON","CITY OF WESTMINSTER","GREATER LONDON","A","A"\n'
+        '"{ID-2}","300000","2024-12-16 00:00","LS1 1AA","T","N","F","2","",'
+        '"Low Rd","","LEEDS","LEEDS","WEST YORKSHIRE","A","D"\n'
+    )
+    mocker.patch("etl.extract.extract_house_prices.log_extract_success")
+
+    df = extract_monthly_update(str(path))
+
+    assert df['unique_id'].tolist() == ['{ID-1}']
+    assert df['borough'].tolist() == ['Westminster']
+    assert df['record_status'].tolist() == ['A']
+    assert df['deed_date'].iloc[0] == pd.Timestamp(2024, 12, 15)
@@ -0,0 +1,128 @@
+import pytest
+import pandas as pd
+from datetime import date
+from unittest.mock import MagicMock
+
+from etl.load.load import _copy_frame, _copy_into, _delete_keys, _ensure_partitions, _upsert_rows, load_data
+
+
+def test_copy_frame_batches():
+    df = pd.DataFrame({
+        'price': [100, 200, 300],
+        'date': [date(2020, 1, 1), date(2020, 1, 2), date(2020, 1, 3)],
+        'address': ['1, High Rd', None, 'Flat "A"'],
+    })
+    cursor = MagicMock()
+    copied = []
+    cursor.copy_expert.side_effect = lambda sql, buf: copied.append(buf.read())
+
+    _copy_frame(df, cursor, 'public.emily_capstone', batch_size=2)
+
+    assert cursor.copy_expert.call_count == 2
+    sql = cursor.copy_expert.call_args[0][0]
+    assert sql == (
+        'COPY public.emily_capstone ("price", "date", "address") '
+        'FROM STDIN WITH (FORMAT csv)'
+    )
+    assert copied[0] == '100,2020-01-01,"1, High Rd"\n200,2020-01-02,\n'
+    assert copied[1] == '300,2020-01-03,"Flat ""A"""\n'
+
+
+def test_copy_into_rolls_back_on_failure():
+    raw = MagicMock()
+    raw.cursor.return_value.copy_expert.side_effect = RuntimeError("boom")
+    engine = MagicMock()
+    engine.raw_connection.return_value = raw
+
+    with pytest.raises(RuntimeError, match="boom"):
+        _copy_into(pd.DataFrame({'price': [1]}), engine, 'public')
+
+    raw.rollback.assert_called_once()
+    raw.commit.assert_not_called()
+    raw.close.assert_called_once()
+
+
+def test_delete_keys_batches():
+    cursor = MagicMock()
+    cursor.rowcount = 2
+
+    deleted = _delete_keys(pd.Series(['a', 'b', 'c']), cursor, 'public', batch_size=2)
+
+    assert deleted == 4
+    assert cursor.execute.call_args_list[0].args == (
+        'DELETE FROM public.emily_capstone WHERE transaction_id = ANY(%s);',
+        (['a', 'b'],),
+    )
+    assert cursor.execute.call_args_list[1].args[1] == (['c'],)
+
+
+def test_ensure_partitions_one_per_year():
+    cursor = MagicMock()
+
+    _ensure_partitions(cursor, 'public', 'emily_capstone', [2023, 2024])
+
+    assert [c.args[0] for c in cursor.execute.call_args_list] == [
+        "CREATE TABLE IF NOT EXISTS public.emily_capstone_y2023 PARTITION OF public.emily_capstone "
+        "FOR VALUES FROM ('2023-01-01') TO ('2024-01-01');",
+        "CREATE TABLE IF NOT EXISTS public.emily_capstone_y2024 PARTITION OF public.emily_capstone "
+        "FOR VALUES FROM ('2024-01-01') TO ('2025-01-01');",
+    ]
+
+
+def test_upsert_rows_replaces_across_partitions():
+    cursor = MagicMock()
+    cursor.fetchone.return_value = (1,)  # partitioned
+    df = pd.DataFrame({
+        'transaction_id': ['a', 'b'],
+        'date': [date(2019, 5, 1), date(2024, 1, 2)],
+    })
+
+    _upsert_rows(df, cursor, 'public')
+
+    sql = [c.args[0] for c in cursor.execute.call_args_list]
+    assert any('emily_capstone_y2019 PARTITION OF' in s for s in sql)
+    assert any('emily_capstone_y2024 PARTITION OF' in s for s in sql)
+    assert sql[-2:] == [
+        'DELETE FROM public.emily_capstone t USING tmp_emily_capstone s '
+        'WHERE t.transaction_id = s.transaction_id;',
+        'INSERT INTO public.emily_capstone ("transaction_id", "date") '
+        'SELECT "transaction_id", "date" FROM tmp_emily_capstone;',
+    ]
+
+
+def test_load_data_can_leave_enrichment_for_later(mocker):
+    mocker.patch("etl.load.load.load_db_config", return_value={"target_database": {}})
+    mocker.patch("etl.load.load.get_db_engine")
+    for helper in ("_create_table", "_copy_into", "prepare_table", "swap_in_table"):
+        mocker.patch(f"etl.load.load.{helper}")
+    enrich = mocker.patch("etl.load.load.enrich_database")
+    version = mocker.patch("etl.load.load.record_dataset_version")
+    df = pd.DataFrame({'price': [1], 'date': [date(2020, 1, 1)]})
+
+    load_data(df, enrich=False)
+    enrich.assert_not_called()
+    version.assert_not_called()
+
+    load_data(df)
+    enrich.assert_called_once()
+    version.assert_called_once()
+
+
+def test_upsert_rows_replaces_on_row_hash_and_id():
+    cursor = MagicMock()
+    cursor.fetchone.return_value = None  # not partitioned
+    df = pd.DataFrame({
+        'transaction_id': ['a'],
+        'date': [date(2024, 1, 2)],
+        'row_hash': [-42],
+    })
+
+    _upsert_rows(df, cursor, 'public')
+
+    sql = [c.args[0] for c in cursor.execute.call_args_list]
+    assert sql[-3:-1] == [
+        'DELETE FROM public.emily_capstone t USING tmp_emily_capstone s '
+        'WHERE t.row_hash = s.row_hash;',
+        'DELETE FROM public.emily_capstone t USING tmp_emily_capstone s '
+        'WHERE t.transaction_id = s.transaction_id;',
+    ]
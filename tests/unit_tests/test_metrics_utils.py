@@ -0,0 +1,95 @@
+import json
+import pandas as pd
+
+from utils.metrics_utils import (
+    profile_stage,
+    summarise_stages,
+    write_run_metrics,
+    latest_metrics,
+    render_cleaning_counts,
+)
+
+
+def drop_first(df):
+    return df.iloc[1:]
+
+
+def test_profile_stage_records_rows_time_and_memory():
+    metrics = []
+    df = pd.DataFrame({"a": range(10), "b": range(10)})
+
+    out = profile_stage(drop_first, metrics)(df)
+
+    assert len(out) == 9
+    [record] = metrics
+    assert record["stage"] == "drop_first"
+    assert (record["rows_in"], record["rows_out"], record["columns_out"]) == (10, 9, 2)
+    assert record["seconds"] >= 0
+    assert record["peak_mem_mb"] >= 0
+
+
+def test_profile_stage_measures_each_stage_from_its_own_rss(mocker):
+    # the first stage leaves the process at 500 MB, the second peaks 40 MB above that
+    rss = iter([100, 600, 500, 500, 540, 500])
+    mocker.patch("utils.metrics_utils._rss", side_effect=lambda: next(rss) * 2 ** 20)
+    mocker.patch("utils.metrics_utils.RSS_SAMPLE_INTERVAL", 60)
+    metrics = []
+    df = pd.DataFrame({"a": range(10)})
+
+    profile_stage(drop_first, metrics)(df)
+    profile_stage(drop_first, metrics)(df)
+
+    assert [m["peak_mem_mb"] for m in metrics] == [500, 40]
+
+
+def test_profile_stage_traces_memory_when_enabled(monkeypatch):
+    monkeypatch.setenv("ETL_TRACE_MEMORY", "true")
+    metrics = []
+
+    profile_stage(lambda df: df.assign(c=df["a"] * 2), metrics)(
+        pd.DataFrame({"a": range(100_000)})
+    )
+
+    # the new column is at least 100k int64s
+    assert metrics[0]["peak_mem_mb"] >= 0.7
+
+
+def test_summarise_stages_folds_chunks():
+    metrics = [
+        {"stage": "a", "seconds": 1.0, "peak_mem_mb": 5.0, "rows_in": 10, "rows_out": 8, "columns_out": 3},
+        {"stage": "b", "seconds": 0.5, "peak_mem_mb": 1.0, "rows_in": 8, "rows_out": 8, "columns_out": 2},
+        {"stage": "a", "seconds": 2.0, "peak_mem_mb": 3.0, "rows_in": 10, "rows_out": 9, "columns_out": 3},
+    ]
+
+    summary = summarise_stages(metrics)
+
+    assert [row["stage"] for row in summary] == ["a", "b"]
+    assert summary[0] == {
+        "stage": "a", "calls": 2, "seconds": 3.0, "peak_mem_mb": 5.0,
+        "rows_in": 20, "rows_out": 17, "columns_out": 3,
+    }
+
+
+def test_write_run_metrics_and_render_counts(tmp_path):
+    metrics = [
+        {"stage": "remove_missing", "seconds": 0.1, "peak_mem_mb": 1.0, "rows_in": 1000, "rows_out": 900, "columns_out": 12},
+        {"stage": "map_codes", "seconds": 0.1, "peak_mem_mb": 1.0, "rows_in": 900, "rows_out": 900, "columns_out": 12},
+        {"stage": "deduplicate", "seconds": 0.1, "peak_mem_mb": 1.0, "rows_in": 900, "rows_out": 850, "columns_out": 10},
+    ]
+
+    path = write_run_metrics(metrics, "full", path=tmp_path / "full.json")
+
+    assert latest_metrics(tmp_path) == path
+    stages = json.loads(path.read_text())["stages"]
+    assert render_cleaning_counts(stages) == (
+        "1. Initial records: 1,000\n"
+        "2. remove_missing: 900 (100 removed)\n"
+        "3. deduplicate: 850 (50 removed)\n"
+        "\n"
+        "**Final shape: 850, 10**"
+    )
+
+
+def test_latest_metrics_none_when_empty(tmp_path):
+    assert latest_metrics(tmp_path) is None
+
@@ -0,0 +1,123 @@
+import pytest
+from unittest.mock import MagicMock
+
+from etl.load.post_load_enrichment import swap_in_table, prepare_table, enrich_database
+
+
+@pytest.fixture
+def mock_session(mocker):
+    session = MagicMock()
+    mocker.patch(
+        "etl.load.post_load_enrichment.sessionmaker",
+        return_value=MagicMock(return_value=session)
+    )
+    mocker.patch(
+        "etl.load.post_load_enrichment.import_sql_query",
+        side_effect=lambda path: f"-- {path.name}"
+    )
+    return session
+
+
+def executed(session):
+    return [str(c.args[0]) for c in session.execute.call_args_list]
+
+
+def test_prepare_table_indexes_analyzes_then_builds_flips(mock_session):
+    prepare_table("public", MagicMock(), "emily_capstone_staging")
+
+    sql = executed(mock_session)
+    assert sql[0].startswith("CREATE INDEX IF NOT EXISTS idx_emily_capstone_staging_postcode")
+    assert ("CREATE INDEX IF NOT EXISTS idx_emily_capstone_staging_postcode_prefix "
+            "ON emily_capstone_staging(postcode text_pattern_ops);") in sql
+    assert ("CREATE INDEX IF NOT EXISTS idx_emily_capstone_staging_date "
+            "ON emily_capstone_staging USING brin (date);") in sql
+    assert sql[-3:] == [
+        "ANALYZE public.emily_capstone_staging;",
+        "DROP MATERIALIZED VIEW IF EXISTS mv_flips_24m_staging;",
+        "-- mv_flips_24m.sql",
+    ]
+    mock_session.commit.assert_called_once()
+
+
+@pytest.mark.parametrize("col", ["row_hash", "transaction_id"])
+def test_prepare_table_makes_the_upsert_keys_unique(mock_session, col):
+    prepare_table("public", MagicMock(), "emily_capstone_staging")
+
+    sql = executed(mock_session)
+    assert (f'CREATE UNIQUE INDEX IF NOT EXISTS uq_emily_capstone_staging_{col} '
+            f'ON emily_capstone_staging({col}, "date");') in sql
+    assert f"CREATE INDEX IF NOT EXISTS idx_emily_capstone_staging_{col} " not in " ".join(sql)
+
+
+def test_swap_in_table_in_one_transaction(mock_session):
+    mock_session.execute.return_value.scalars.return_value.all.side_effect = [
+        ["emily_capstone_staging_y2020"],
+        ["idx_emily_capstone_staging_postcode"],
+        ["emily_capstone_staging_y2020_postcode_idx"],
+        ["uq_mv_flips_24m_staging_sale"],
+    ]
+
+    swap_in_table("public", MagicMock(), "emily_capstone_staging")
+
+    sql = executed(mock_session)
+    assert "FROM pg_inherits" in sql[0]
+    assert all("FROM pg_indexes" in s for s in sql[1:4])
+    assert sql[4:11] == [
+        "DROP TABLE IF EXISTS public.emily_capstone CASCADE;",
+        "ALTER TABLE public.emily_capstone_staging RENAME TO emily_capstone;",
+        "ALTER TABLE public.emily_capstone_staging_y2020 RENAME TO emily_capstone_y2020;",
+        "ALTER MATERIALIZED VIEW public.mv_flips_24m_staging RENAME TO mv_flips_24m;",
+        "ALTER INDEX public.idx_emily_capstone_staging_postcode "
+        "RENAME TO idx_emily_capstone_postcode;",
+        "ALTER INDEX public.emily_capstone_staging_y2020_postcode_idx "
+        "RENAME TO emily_capstone_y2020_postcode_idx;",
+        "ALTER INDEX public.uq_mv_flips_24m_staging_sale "
+        "RENAME TO uq_mv_flips_24m_sale;",
+    ]
+    # views are re-created before the single commit
+    assert sql[-1] == "-- v_avg_price_outcode.sql"
+    mock_session.commit.assert_called_once()
+
+
+def test_swap_in_table_rolls_back(mock_session):
+    mock_session.execute.side_effect = RuntimeError("locked")
+
+    with pytest.raises(RuntimeError):
+        swap_in_table("public", MagicMock(), "emily_capstone_staging")
+
+    mock_session.rollback.assert_called_once()
+    mock_session.commit.assert_not_called()
+
+
+@pytest.mark.parametrize("exists, expected", [
+    ("mv_flips_24m", "REFRESH MATERIALIZED VIEW CONCURRENTLY mv_flips_24m;"),
+    (None, "-- mv_flips_24m.sql"),
+])
+def test_enrich_database_refreshes_or_builds_flips(mocker, mock_session, exists, expected):
+    mocker.patch("etl.load.post_load_enrichment._has_column", return_value=True)
+    mock_session.execute.return_value.scalar.return_value = exists
+
+    enrich_database(engine=MagicMock())
+
+    sql = executed(mock_session)
+    assert "DROP VIEW IF EXISTS v_flips_24m;" in sql
+    assert expected in sql
+    mock_session.commit.assert_called_once()
+
+
+def test_enrich_database_can_skip_flips(mocker, mock_session):
+    mocker.patch("etl.load.post_load_enrichment._has_column", return_value=True)
+
+    enrich_database(engine=MagicMock(), refresh_flips=False)
+
+    assert not any("flips" in s for s in executed(mock_session))
+
+
+def test_enrich_database_reuses_the_given_engine(mocker, mock_session):
+    get_engine = mocker.patch("etl.load.post_load_enrichment.get_db_engine")
+    mocker.patch("etl.load.post_load_enrichment._has_column", return_value=True)
+    engine = MagicMock()
+
+    enrich_database("public", engine)
+
+    get_engine.assert_not_called()
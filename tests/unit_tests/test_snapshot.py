@@ -0,0 +1,118 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datetime import date
+from unittest.mock import MagicMock
+from sqlalchemy.types import BIGINT, BOOLEAN, DATE, INTEGER, TEXT
+
+from etl.load.snapshot import (
+    export_snapshot, snapshot_path, snapshot_version, _arrow_schema, SNAPSHOT_FLIPS,
+)
+
+TABLE_SCHEMA = pa.schema([
+    ("transaction_id", pa.string()), ("price", pa.int32()), ("date", pa.date32()),
+    ("postcode", pa.string()), ("borough", pa.string()), ("address", pa.string()),
+])
+FLIPS_SCHEMA = pa.schema([("postcode", pa.string()), ("pct_gain", pa.int32())])
+
+
+def sample_rows():
+    return pd.DataFrame({
+        "transaction_id": ["a", "b", "c"],
+        "price": [100, 200, 300],
+        "date": [date(2023, 1, 5), date(2024, 2, 1), date(2024, 3, 1)],
+        "postcode": ["E1 1AA", "E1 2BB", "SW1A 1AA"],
+        "borough": ["Hackney", "Hackney", "Westminster"],
+        "address": ["1 High St", "2 High St", None],
+    })
+
+
+def mock_database(mocker, *chunks, flips=None):
+    """read_sql streams chunks of the table, then returns the flips view."""
+    flips = pd.DataFrame({"postcode": ["E1 1AA"], "pct_gain": [50]}) if flips is None else flips
+    mocker.patch("etl.load.snapshot.pd.read_sql", side_effect=[iter(chunks), flips])
+    mocker.patch(
+        "etl.load.snapshot._arrow_schema",
+        side_effect=lambda conn, relation: FLIPS_SCHEMA if relation.startswith("mv_") else TABLE_SCHEMA,
+    )
+
+
+def test_export_snapshot_partitions_by_year_and_borough(mocker, tmp_path):
+    df = sample_rows()
+    mock_database(mocker, df.iloc[:2], df.iloc[2:])
+    path = tmp_path / "snapshot"
+
+    rows = export_snapshot(MagicMock(), 7, path=path)
+
+    assert rows == 3
+    assert snapshot_version(path) == 7
+    live = snapshot_path(path)
+    assert sorted(p.relative_to(live).as_posix() for p in live.glob("year=*/borough=*")) == [
+        "year=2023/borough=Hackney",
+        "year=2024/borough=Hackney",
+        "year=2024/borough=Westminster",
+    ]
+    assert pq.read_table(live / SNAPSHOT_FLIPS).to_pydict() == {"postcode": ["E1 1AA"], "pct_gain": [50]}
+
+
+def test_export_snapshot_keeps_types_of_all_null_chunks(mocker, tmp_path):
+    df = sample_rows()
+    # the first chunk has no address at all, the second one does
+    first = df.iloc[2:]
+    mock_database(mocker, first, df.iloc[:2])
+    path = tmp_path / "snapshot"
+
+    export_snapshot(MagicMock(), 1, path=path)
+
+    table = pq.ParquetDataset(snapshot_path(path)).read()
+    assert table.schema.field("address").type == pa.string()
+    assert sorted(table["address"].drop_null().to_pylist()) == ["1 High St", "2 High St"]
+
+
+def test_export_snapshot_replaces_the_previous_one(mocker, tmp_path):
+    path = tmp_path / "snapshot"
+    mock_database(mocker, sample_rows())
+    export_snapshot(MagicMock(), 1, path=path)
+    first = snapshot_path(path)
+    mock_database(mocker, sample_rows().iloc[:1])
+
+    export_snapshot(MagicMock(), 2, path=path)
+
+    assert snapshot_version(path) == 2
+    assert [p.name for p in snapshot_path(path).glob("year=*")] == ["year=2023"]
+    # a reader that opened the first snapshot can still finish its scan
+    assert len(pq.ParquetDataset(first).read()) == 3
+
+
+def test_export_snapshot_keeps_only_the_previous_one(mocker, tmp_path):
+    path = tmp_path / "snapshot"
+    for version in (1, 2, 3):
+        mock_database(mocker, sample_rows())
+        export_snapshot(MagicMock(), version, path=path)
+    # an export that died halfway is cleared by the next one
+    (path / "v4-0").mkdir()
+    mock_database(mocker, sample_rows())
+
+    export_snapshot(MagicMock(), 5, path=path)
+
+    assert sorted(p.name.split("-")[0] for p in path.iterdir()) == ["CURRENT", "v3", "v5"]
+
+
+def test_arrow_schema_from_sql_types(mocker):
+    mocker.patch("etl.load.snapshot.inspect").return_value.get_columns.return_value = [
+        {"name": "price", "type": INTEGER()},
+        {"name": "row_hash", "type": BIGINT()},
+        {"name": "date", "type": DATE()},
+        {"name": "new_build", "type": BOOLEAN()},
+        {"name": "postcode_sector", "type": TEXT()},
+    ]
+
+    assert _arrow_schema(MagicMock(), "emily_capstone") == pa.schema([
+        ("price", pa.int32()), ("row_hash", pa.int64()), ("date", pa.date32()),
+        ("new_build", pa.bool_()), ("postcode_sector", pa.string()),
+    ])
+
+
+def test_snapshot_version_without_snapshot(tmp_path):
+    assert snapshot_version(tmp_path / "missing") == 0
+
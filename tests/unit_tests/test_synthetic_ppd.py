@@ -0,0 +1,58 @@
+import pandas as pd
+
+from benchmarks.synthetic_ppd import generate_ppd, write_raw_files, DIRTY
+from etl.extract.extract_house_prices import RAW_FILES
+
+ROWS = 20_000
+
+
+def generate(rows=ROWS, **kwargs):
+    return pd.concat(generate_ppd(rows, "Wandsworth", **kwargs), ignore_index=True)
+
+
+def test_generate_ppd_rows_plus_duplicate_sales():
+    df = generate(chunksize=7_000)
+
+    duplicates = len(df) - ROWS
+    assert 0 < duplicates < ROWS * DIRTY["duplicate_sale"] * 2
+    assert df["unique_id"].is_unique
+
+
+def test_generate_ppd_is_seeded():
+    pd.testing.assert_frame_equal(generate(2_000), generate(2_000))
+    assert not generate(2_000)["price_paid"].equals(generate(2_000, seed=1)["price_paid"])
+
+
+def test_generate_ppd_dirty_share():
+    df = generate()
+    price = pd.to_numeric(df["price_paid"], errors="coerce")
+    shares = {
+        "missing_price": df["price_paid"].isna().mean(),
+        "bad_price": (df["price_paid"].notna() & price.isna()).mean(),
+        "missing_postcode": df["postcode"].isna().mean(),
+        "bad_date": pd.to_datetime(df["deed_date"], format="%Y-%m-%d", errors="coerce").isna().mean(),
+        "category_b": (df["transaction_category"] == "B").mean(),
+    }
+
+    for kind, share in shares.items():
+        assert DIRTY[kind] / 2 < share < DIRTY[kind] * 2, kind
+
+
+def test_duplicate_sales_follow_the_original_under_the_reversed_id():
+    df = generate()
+    ids = df["unique_id"].str[1:-1]
+
+    copies = df.index[ids == ids.shift().str[::-1]]
+
+    assert len(copies) == len(df) - ROWS
+    for i in copies:
+        pd.testing.assert_series_equal(
+            df.loc[i].drop("unique_id"), df.loc[i - 1].drop("unique_id"), check_names=False
+        )
+
+
+def test_write_raw_files_one_file_per_borough(tmp_path):
+    written = write_raw_files(str(tmp_path), 1_000)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(RAW_FILES.values())
+    assert written == sum(len(pd.read_csv(tmp_path / name)) for name in RAW_FILES.values())
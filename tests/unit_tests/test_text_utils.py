@@ -0,0 +1,54 @@
+import pandas as pd
+from utils.text_utils import (
+    map_unique, map_unique_many, map_code, normalise_postcode, title_case,
+    outcode, postcode_sector, postcode_area,
+)
+
+
+def test_map_unique_calls_func_once_per_value():
+    calls = []
+    values = pd.Series(['a', 'b', 'a', None, 'b'], index=[5, 4, 3, 2, 1], name='col')
+
+    def upper(value):
+        calls.append(value)
+        return value.upper()
+
+    out = map_unique(values, upper)
+    assert sorted(calls) == ['a', 'b']
+    assert out.tolist() == ['A', 'B', 'A', None, 'B']
+    assert out.index.tolist() == [5, 4, 3, 2, 1]
+    assert out.name == 'col'
+
+
+def test_map_unique_many_one_column_per_func():
+    values = pd.Series(['SW18 1AA', None, 'SW18 1AA'], index=[2, 1, 0])
+    out = map_unique_many(values, {'outcode': outcode, 'area': postcode_area})
+    assert out.to_dict('list') == {'outcode': ['SW18', None, 'SW18'], 'area': ['SW', None, 'SW']}
+    assert out.index.tolist() == [2, 1, 0]
+
+
+def test_postcode_parts():
+    assert (outcode('SW1A 1AA'), postcode_sector('SW1A 1AA'), postcode_area('SW1A 1AA')) == ('SW1A', 'SW1A 1', 'SW')
+    assert (outcode('E1 6AN'), postcode_sector('E1 6AN'), postcode_area('E1 6AN')) == ('E1', 'E1 6', 'E')
+    # partial postcodes have no sector
+    assert (outcode('SW18'), postcode_sector('SW18'), postcode_area('SW18')) == ('SW18', None, 'SW')
+
+
+def test_map_code_keeps_unknown_codes():
+    assert map_unique(pd.Series(['F', 'X']), map_code({'F': 'Flat'})).tolist() == ['Flat', 'X']
+
+
+def test_normalise_postcode():
+    assert normalise_postcode(' sw18  1aa') == 'SW18 1AA'
+    assert normalise_postcode('sw181aa') == 'SW18 1AA'
+    assert normalise_postcode('e11aa') == 'E1 1AA'
+    # partial postcodes are only cleaned up, never split
+    assert normalise_postcode(' sw18 ') == 'SW18'
+    assert normalise_postcode('E1') == 'E1'
+
+
+def test_title_case():
+    assert title_case('  HIGH   STREET ') == 'High Street'
+    assert title_case("KING'S ROAD") == "King's Road"
+    assert title_case('CITY OF WESTMINSTER') == 'City of Westminster'
+    assert title_case('THE AVENUE') == 'The Avenue'
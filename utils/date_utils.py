@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+from typing import List, Tuple
+
+# deed_date layouts seen in PPD files: the PPD app export, the bulk files
+# (midnight time appended) and day-first dates from hand-edited CSVs
+DATE_FORMATS = ["%Y-%m-%d", "%Y-%m-%d %H:%M", "%d/%m/%Y"]
+
+
+def parse_dates(
+    values: pd.Series, formats: List[str] = DATE_FORMATS,
+) -> Tuple[pd.Series, pd.Series]:
+    """
+    Parse date strings with explicit formats, tried in order, once per
+    distinct value (a few thousand dates repeat over millions of rows).
+    datetime64 input is returned as is.
+
+    Args:
+        values (pd.Series): The dates as text.
+        formats (list): strptime formats to try.
+
+    Returns:
+        tuple: the datetime64[ns] Series (NaT where no format matched or the
+        value was missing) and the row count of every value that did not parse.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values, pd.Series(dtype="int64")
+
+    codes, uniques = pd.factorize(values)
+    text = pd.Series(uniques, dtype=object).astype(str).str.strip()
+    parsed = pd.Series(pd.NaT, index=text.index, dtype="datetime64[ns]")
+    for fmt in formats:
+        todo = parsed.isna()
+        if not todo.any():
+            break
+        parsed[todo] = pd.to_datetime(text[todo], format=fmt, errors="coerce")
+
+    rows = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    unparsed = parsed.isna()
+    failed = pd.Series(
+        rows[unparsed.to_numpy()], index=text[unparsed].to_numpy()
+    )
+
+    # code -1 (missing) picks the trailing NaT
+    dates = np.append(parsed.to_numpy(), np.datetime64("NaT", "ns"))[codes]
+    return (
+        pd.Series(dates, index=values.index, name=values.name),
+        failed.sort_values(ascending=False),
+    )
@@ -1,6 +1,7 @@
 from sqlalchemy import create_engine
 from sqlalchemy.exc import SQLAlchemyError, OperationalError
 import logging
+import threading
 from utils.logging_utils import setup_logger
 from etl.config.db_config import load_db_config
 import os
@@ -17,6 +18,11 @@ class QueryExecutionError(Exception):
 logger = setup_logger(__name__, "database.log", level=logging.DEBUG)
 
 
+# one engine (and so one connection pool) per config for the whole process
+_engines = {}
+_engines_lock = threading.Lock()
+
+
 def get_db_connection(connection_params):
     try:
         engine = create_db_engine(connection_params)
@@ -40,7 +46,41 @@ def get_db_connection(connection_params):
         raise Exception(f"An error occurred: {e}")
 
 
-def create_db_engine(connection_params):
+def get_db_engine(connection_params, **pool_settings):
+    """
+    Shared, pooled engine for connection_params: built on first use and
+    handed back to every later caller with the same config and settings.
+    :param pool_settings: overrides of the DB_POOL_* / DB_MAX_OVERFLOW values
+    """
+    settings = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_pre_ping": (
+            os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+        ),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        **pool_settings,
+    }
+    key = (
+        tuple(sorted(connection_params.items())),
+        os.getenv("TARGET_DB_SSLMODE"),
+        tuple(sorted(settings.items())),
+    )
+    with _engines_lock:
+        if key not in _engines:
+            _engines[key] = create_db_engine(connection_params, **settings)
+        return _engines[key]
+
+
+def dispose_db_engines():
+    """Close the pooled connections of every shared engine."""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
+
+def create_db_engine(connection_params, **engine_kwargs):
     # print("!!!", os.getenv("TARGET_DB_SSLMODE"))
     try:
         if (
@@ -57,7 +97,9 @@ def create_db_engine(connection_params):
         engine = create_engine(
             f"postgresql+psycopg2://{connection_params['user']}"
             f":{connection_params['password']}@{connection_params['host']}"
-            f":{connection_params['port']}/{connection_params['dbname']}?sslmode={sslmode}&options=-csearch_path%3D{schema}"
+            f":{connection_params['port']}/{connection_params['dbname']}"
+            f"?sslmode={sslmode}&options=-csearch_path%3D{schema}",
+            **engine_kwargs,
         )
         logger.setLevel(logging.INFO)
         logger.info("Successfully created the database engine.")
@@ -1,4 +1,5 @@
 import os
+import hashlib
 import pandas as pd
 
 
@@ -42,3 +43,21 @@ def save_dataframe_to_csv(
     os.makedirs(output_dir, exist_ok=True)
     df.to_csv(os.path.join(output_dir, filename), index=False)
     print(f"Data saved to {os.path.join(output_dir, filename)}")
+
+
+def file_fingerprint(path: str, block_size: int = 1 << 20) -> str:
+    """
+    SHA-256 of a file's contents, read in blocks.
+
+    Args:
+        path (str): The file to fingerprint.
+        block_size (int): Bytes read at a time.
+
+    Returns:
+        str: The hex digest; it changes whenever the file content does.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
@@ -42,6 +42,8 @@ def log_extract_success(logger, type, shape, execution_time, expected_rate):
     logger.info(f"Extracted {shape[0]} rows " f"and {shape[1]} columns")
     logger.info(f"Execution time: {execution_time} seconds")
 
+    if not shape[0]:
+        return
     if execution_time / shape[0] <= expected_rate:
         logger.info(
             "Execution time per row: " f"{execution_time / shape[0]} seconds"
@@ -52,3 +54,14 @@ def log_extract_success(logger, type, shape, execution_time, expected_rate):
             f"Execution time per row exceeds {expected_rate}: "
             f"{execution_time / shape[0]} seconds"
         )
+
+
+def log_load_success(logger, type, rows, execution_time):
+    logger.setLevel(logging.INFO)
+    logger.info(f"Data load successful for {type}!")
+    logger.info(f"Loaded {rows} rows")
+    logger.info(f"Execution time: {execution_time} seconds")
+    if execution_time > 0:
+        logger.info(
+            "Load throughput: " f"{rows / execution_time:.0f} rows/sec"
+        )
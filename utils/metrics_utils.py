@@ -0,0 +1,172 @@
+import os
+import json
+import logging
+import threading
+import timeit
+import tracemalloc
+import psutil
+import pandas as pd
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List
+from utils.logging_utils import setup_logger
+
+logger = setup_logger(__name__, "transform_data.log", level=logging.INFO)
+
+# one JSON file of stage metrics per ETL run, next to the (untracked) logs;
+# METRICS_DIR overrides it
+DEFAULT_METRICS_DIR = Path(__file__).resolve().parents[1] / "logs" / "metrics"
+
+# seconds between two RSS samples
+RSS_SAMPLE_INTERVAL = 0.01
+
+
+def _rss() -> int:
+    return psutil.Process().memory_info().rss
+
+
+@contextmanager
+def _sample_peak_rss(interval: float = None):
+    """
+    Sample the current RSS on a background thread while the block runs.
+    Yields a one-item list that holds the highest sample once the block is
+    done.
+    """
+    interval = interval or RSS_SAMPLE_INTERVAL
+    peak = [_rss()]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(interval):
+            peak[0] = max(peak[0], _rss())
+
+    thread = threading.Thread(target=sample, daemon=True)
+    thread.start()
+    try:
+        yield peak
+    finally:
+        done.set()
+        thread.join()
+        peak[0] = max(peak[0], _rss())
+
+
+def profile_stage(
+    stage: Callable[[pd.DataFrame], pd.DataFrame], metrics: List[dict] = None,
+) -> Callable[[pd.DataFrame], pd.DataFrame]:
+    """
+    Wrap a DataFrame -> DataFrame stage so every call logs and appends
+    {stage, seconds, peak_mem_mb, rows_in, rows_out, columns_out} to metrics.
+    peak_mem_mb is the highest RSS sampled during the stage above the RSS
+    on entry, or with ETL_TRACE_MEMORY the peak traced allocation above what
+    was live on entry.
+    """
+    def wrapped(df: pd.DataFrame) -> pd.DataFrame:
+        rows_in = len(df)
+        # ETL_TRACE_MEMORY: exact peaks via tracemalloc, ~3x slower than
+        # sampling the process RSS while the stage runs
+        trace = os.getenv("ETL_TRACE_MEMORY", "false").lower()
+        if trace in ("1", "true", "yes"):
+            tracing = not tracemalloc.is_tracing()
+            if tracing:
+                tracemalloc.start()
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            start_time = timeit.default_timer()
+            out = stage(df)
+            seconds = timeit.default_timer() - start_time
+            peak = tracemalloc.get_traced_memory()[1] - base
+            if tracing:
+                tracemalloc.stop()
+        else:
+            base = _rss()
+            with _sample_peak_rss() as sampled:
+                start_time = timeit.default_timer()
+                out = stage(df)
+                seconds = timeit.default_timer() - start_time
+            peak = sampled[0] - base
+
+        record = {
+            "stage": stage.__name__,
+            "seconds": round(seconds, 6),
+            "peak_mem_mb": round(peak / 2**20, 3),
+            "rows_in": rows_in,
+            "rows_out": len(out),
+            "columns_out": out.shape[1],
+        }
+        logger.info(
+            "%-32s %8.3fs %9.1f MB  %d → %d rows", record["stage"],
+            seconds, record["peak_mem_mb"], rows_in, record["rows_out"],
+        )
+        if metrics is not None:
+            metrics.append(record)
+        return out
+
+    wrapped.__name__ = stage.__name__
+    return wrapped
+
+
+def summarise_stages(metrics: List[dict]) -> List[dict]:
+    """
+    Fold the records of repeated calls (one per chunk) into one row per
+    stage, in first-seen order: times and rows summed, peak memory maxed.
+    """
+    summary: Dict[str, dict] = {}
+    for record in metrics:
+        row = summary.setdefault(record["stage"], {
+            "stage": record["stage"], "calls": 0, "seconds": 0.0,
+            "peak_mem_mb": 0.0, "rows_in": 0, "rows_out": 0,
+        })
+        row["calls"] += 1
+        row["seconds"] = round(row["seconds"] + record["seconds"], 6)
+        row["peak_mem_mb"] = max(row["peak_mem_mb"], record["peak_mem_mb"])
+        row["rows_in"] += record["rows_in"]
+        row["rows_out"] += record["rows_out"]
+        row["columns_out"] = record["columns_out"]
+    return list(summary.values())
+
+
+def write_run_metrics(metrics: List[dict], mode: str,
+                      path: Path = None) -> Path:
+    """
+    Write the per-stage summary of one run to
+    METRICS_DIR/<mode>-<utc time>.json.
+    :return: path of the file written
+    """
+    finished_at = datetime.now(timezone.utc)
+    directory = Path(os.getenv("METRICS_DIR", DEFAULT_METRICS_DIR))
+    name = f"{mode}-{finished_at:%Y%m%dT%H%M%SZ}.json"
+    path = Path(path or directory / name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({
+        "mode": mode,
+        "finished_at": finished_at.isoformat(timespec="seconds"),
+        "stages": summarise_stages(metrics),
+    }, indent=2))
+    logger.info("Wrote stage metrics to %s", path)
+    return path
+
+
+def latest_metrics(directory: Path = None) -> Path:
+    """Most recently written metrics file, None when there is none."""
+    directory = directory or os.getenv("METRICS_DIR", DEFAULT_METRICS_DIR)
+    files = sorted(Path(directory).glob("*.json"),
+                   key=lambda p: p.stat().st_mtime)
+    return files[-1] if files else None
+
+
+def render_cleaning_counts(stages: List[dict]) -> str:
+    """Markdown row counts of a run's stage summary, for the README."""
+    lines = [f"1. Initial records: {stages[0]['rows_in']:,}"]
+    changed = (r for r in stages if r["rows_out"] != r["rows_in"])
+    for n, row in enumerate(changed, start=2):
+        lines.append(
+            f"{n}. {row['stage']}: {row['rows_out']:,} "
+            f"({row['rows_in'] - row['rows_out']:,} removed)"
+        )
+    final = stages[-1]
+    lines.append("")
+    lines.append(
+        f"**Final shape: {final['rows_out']:,}, {final['columns_out']}**"
+    )
+    return "\n".join(lines)
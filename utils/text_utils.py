@@ -0,0 +1,92 @@
+import re
+import string
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, Optional
+
+
+def map_unique(values: pd.Series, func: Callable) -> pd.Series:
+    """
+    func applied once per distinct value (factorize → map → take), so the
+    cost follows the cardinality of the column, not its length.
+    Missing values stay missing (None) and are not passed to func.
+    """
+    codes, uniques = pd.factorize(values)
+    mapped = [func(u) for u in uniques]
+    # code -1 (missing) picks the trailing None
+    taken = np.array(mapped + [None], dtype=object)[codes]
+    return pd.Series(taken, index=values.index, name=values.name)
+
+
+def map_unique_many(values: pd.Series,
+                    funcs: Dict[str, Callable]) -> pd.DataFrame:
+    """
+    map_unique for several functions of one column, factorizing it once;
+    one column per func.
+    """
+    codes, uniques = pd.factorize(values)
+    return pd.DataFrame(
+        {
+            name: np.array(
+                [func(u) for u in uniques] + [None], dtype=object
+            )[codes]
+            for name, func in funcs.items()
+        },
+        index=values.index,
+    )
+
+
+def map_code(mapping: Dict[str, str]) -> Callable:
+    """Lookup in mapping, unknown codes kept as they are."""
+    return lambda code: mapping.get(code, code)
+
+
+def normalise_postcode(postcode) -> str:
+    """
+    Upper case, single space before the 3-character inward code
+    ("sw181aa" → "SW18 1AA").
+    """
+    compact = "".join(str(postcode).split()).upper()
+    inward = compact[-3:]
+    # only full postcodes (outward 2-4 characters + digit, letter, letter)
+    # are split
+    if len(compact) < 5 or not (inward[0].isdigit() and inward[1:].isalpha()):
+        return " ".join(str(postcode).split()).upper()
+    return f"{compact[:-3]} {inward}"
+
+
+def outcode(postcode) -> str:
+    """Outward code of a normalised postcode ("SW18 1AA" → "SW18")."""
+    return str(postcode).split(" ")[0]
+
+
+def postcode_sector(postcode) -> Optional[str]:
+    """
+    Outward code and inward digit ("SW18 1AA" → "SW18 1"); None for partial
+    postcodes.
+    """
+    parts = str(postcode).split(" ")
+    return f"{parts[0]} {parts[1][0]}" if len(parts) > 1 and parts[1] else None
+
+
+def postcode_area(postcode) -> Optional[str]:
+    """The letters the outward code starts with ("SW18 1AA" → "SW")."""
+    area = re.match(r"[A-Z]*", outcode(postcode)).group()
+    return area or None
+
+
+# kept lower case unless they start the name ("City of Westminster",
+# "Kingston upon Thames")
+LOWER_WORDS = {"of", "and", "upon", "on", "the", "in"}
+
+
+def title_case(text) -> str:
+    """
+    Collapse whitespace and capitalise the words
+    ("  KING'S  ROAD" → "King's Road").
+    """
+    words = str(text).split()
+    return " ".join(
+        w.lower() if i and w.lower() in LOWER_WORDS else string.capwords(w)
+        for i, w in enumerate(words)
+    )